@@ -0,0 +1,59 @@
+# Імпорт контактів з CSV: import_contacts проти додавання по одному, як це робить add_contact.
+# Запуск (після "pip install -e ."): python benchmarks/bench_import.py [кількість рядків]
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+from bot_assistant.contact_io import import_contacts
+from bot_assistant.contacts import AddressBook, Record
+
+SYLLABLES = ["an", "bo", "ka", "le", "mi", "na", "ol", "ra", "si", "ta", "vi", "ze", "yu", "dr", "ko"]
+
+
+def make_csv(filename, count):
+    rng = random.Random(1)
+    with open(filename, "w", encoding="utf-8", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(("name", "phones", "email", "birthday"))
+        for i in range(count):
+            name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+            surname = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(3, 5))).title()
+            birthday = f"{rng.randint(1950, 2005)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" if i % 3 else ""
+            writer.writerow((f"{name} {surname} {i}", f"{rng.randrange(10 ** 10):010d}",
+                             f"{name.lower()}{i}@example.com", birthday))
+
+
+def one_by_one(book, filename):
+    # як add_contact: окремий Record, перевірка телефону і add_record для кожного рядка
+    with open(filename, encoding="utf-8", newline="") as fh:
+        for row in csv.DictReader(fh):
+            if row["name"] in book.data or book.find_by_phone(row["phones"]) is not None:
+                continue
+            record = Record(row["name"], row["birthday"] or None, row["email"] or None)
+            record.phones.append(row["phones"])
+            book.add_record(record)
+
+
+def timed(action, *args):
+    started = time.perf_counter()
+    action(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "contacts.csv")
+        make_csv(filename, count)
+        single = timed(one_by_one, AddressBook(os.path.join(folder, "single.json")), filename)
+        bulk = timed(import_contacts, AddressBook(os.path.join(folder, "bulk.json")), filename)
+    print(f"{count} rows")
+    print(f"one by one:      {single:.2f} s ({count / single:,.0f} rows/s)")
+    print(f"import_contacts: {bulk:.2f} s ({count / bulk:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Адресна книга в пам'яті (сховище binary) проти знімка через mmap (сховище mapped):
+# час відкриття, пошуку і пам'ять процесу. Кожен варіант запускається в окремому процесі.
+# Запуск (після "pip install -e ."): python benchmarks/bench_mapped.py [кількість контактів]
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from run_suite import make_contacts, write_json
+
+QUERIES = 1000
+
+
+def memory():
+    # (RSS, приватна частина RSS) у МіБ: сторінки знімка в кеші ОС спільні для всіх процесів
+    try:
+        with open("/proc/self/status") as fh:
+            status = dict(line.split(":", 1) for line in fh)
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, None
+    rss = int(status["VmRSS"].split()[0]) / 1024
+    return rss, rss - int(status.get("RssFile", "0 kB").split()[0]) / 1024 - int(
+        status.get("RssShmem", "0 kB").split()[0]) / 1024
+
+
+def timed(action):
+    started = time.perf_counter()
+    result = action()
+    return time.perf_counter() - started, result
+
+
+def run(storage, json_file, names_file):
+    from bot_assistant.contacts import AddressBook
+    with open(names_file, encoding="utf-8") as fh:
+        names = fh.read().splitlines()
+    opened, book = timed(lambda: AddressBook(json_file, storage=storage))
+    find, _ = timed(lambda: [book.find(name) for name in names])
+    find /= len(names)
+    # вибірковий запит (один контакт) і короткий, під який підпадає багато контактів
+    search, found = timed(lambda: len(book.search(names[-1].lower())))
+    broad, broad_found = timed(lambda: len(book.search("kan")))
+    upcoming, birthdays = timed(lambda: len(book.upcoming_birthdays(7)))
+    rss, private = memory()
+    book.close()
+    private = f"{private:.0f}" if private is not None else "?"
+    print(f"{storage}: open {opened:.3f} s, find {find * 1e6:.1f} us, search {search * 1000:.1f} ms ({found}), "
+          f"search 'kan' {broad * 1000:.1f} ms ({broad_found}), birthdays {upcoming * 1000:.1f} ms ({birthdays}), "
+          f"RSS {rss:.0f} MiB, private {private} MiB")
+
+
+def main():
+    if len(sys.argv) == 4:
+        run(*sys.argv[1:])
+        return
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as folder:
+        json_file = os.path.join(folder, "address_book.json")
+        contacts = make_contacts(count)
+        write_json(json_file, contacts)
+        names_file = os.path.join(folder, "names.txt")
+        with open(names_file, "w", encoding="utf-8") as fh:
+            fh.write("\n".join(item["name"] for item in contacts[::max(1, count // QUERIES)]))
+        del contacts
+        # перше відкриття mapped один раз перетворює json у знімок з індексами - його не міряємо
+        from bot_assistant.contacts import AddressBook
+        started = time.perf_counter()
+        AddressBook(json_file, storage="mapped").close()
+        print(f"{count} contacts, json -> indexed snapshot in {time.perf_counter() - started:.3f} s")
+        for storage in ("binary", "mapped"):
+            subprocess.run([sys.executable, __file__, storage, json_file, names_file], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Пам'ять на контакти і нотатки: класи з __slots__ проти колишніх класів з __dict__.
+# Запуск (після "pip install -e ."): python benchmarks/bench_memory.py [кількість]
+import gc
+import sys
+import tracemalloc
+from datetime import datetime
+
+from bot_assistant.contacts import Record
+from bot_assistant.notebook import Note
+
+TAGS = ["work", "home", "family", "ideas", "shopping"]
+
+
+# класи у тому вигляді, в якому вони були до переходу на __slots__
+class DictField:
+    def __init__(self, value):
+        self.__value = value
+
+
+class DictBirthday(DictField):
+    pass
+
+
+class DictRecord:
+    def __init__(self, name, birthday=None, email=None):
+        self.name = DictField(name)
+        self.phones = []
+        self.birthday = DictBirthday(birthday)
+        self.email = DictField(email)
+
+
+class DictNote:
+    def __init__(self, title, text, tags):
+        self.title = title
+        self.text = text
+        self.tags = tags.split(",")
+        self.creation_date = datetime.now()
+
+
+def make_record(cls, i):
+    record = cls(f"Contact {i}", None, f"contact{i}@example.com")
+    record.phones.append(f"{i:010d}")
+    return record
+
+
+def make_note(cls, i):
+    tags = ",".join(TAGS[j % len(TAGS)] for j in range(i % 3 + 1))
+    return cls(f"note_{i}", f"text of note {i}", tags)
+
+
+def measure(factory, cls, count):
+    gc.collect()
+    tracemalloc.start()
+    objects = [factory(cls, i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rows = [
+        ("Record", measure(make_record, DictRecord, count), measure(make_record, Record, count)),
+        ("Note", measure(make_note, DictNote, count), measure(make_note, Note, count)),
+    ]
+    print(f"{count} objects")
+    print(f"{'class':<8} {'__dict__, B/obj':>16} {'__slots__, B/obj':>17} {'saved':>7}")
+    for name, before, after in rows:
+        print(f"{name:<8} {before / count:>16.0f} {after / count:>17.0f} {1 - after / before:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Нормалізація імен файлів: re.sub + str.translate на кожне ім'я проти однопрохідного Normalizer з кешем.
+# Запуск (після "pip install -e ."): python benchmarks/bench_normalize.py [кількість імен]
+import random
+import re
+import sys
+import timeit
+
+from bot_assistant.normalizer import CYRILLIC, Normalizer
+
+WORDS = ["фото", "Звіт", "report", "відпустка", "IMG", "договір (копія)", "final-v2", "ЩоДенник", "music #1"]
+EXTENSIONS = ["jpg", "pdf", "txt", "mp3", "docx", ""]
+
+# реалізація FileSorter.normalize до переходу на Normalizer
+TRANS = {}
+for cyrillic, latin in CYRILLIC.items():
+    TRANS[ord(cyrillic)] = latin
+    TRANS[ord(cyrillic.upper())] = latin.upper()
+
+
+def old_normalize(name):
+    base_name, dot, extension = name.rpartition(".")
+    translate_name = re.sub(r'\W', '_', base_name.translate(TRANS))
+    return f"{translate_name}{dot}{extension}"
+
+
+def make_names(count, unique):
+    random.seed(1)
+    pool = []
+    for i in range(unique):
+        extension = random.choice(EXTENSIONS)
+        name = f"{random.choice(WORDS)} {random.choice(WORDS)} {i}"
+        pool.append(f"{name}.{extension}" if extension else name)
+    return [random.choice(pool) for _ in range(count)]
+
+
+def measure(function, names, repeat=5):
+    return min(timeit.repeat(lambda: [function(name) for name in names], number=1, repeat=repeat))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print(f"{count} names")
+    print(f"{'unique names':<14} {'re.sub, ms':>11} {'no cache, ms':>13} {'cached, ms':>11}")
+    for unique in (count, count // 10, 100):
+        names = make_names(count, unique)
+        uncached = Normalizer(cache_size=0)
+        assert [old_normalize(name) for name in names] == [uncached(name) for name in names]
+        old = measure(old_normalize, names)
+        single_pass = measure(uncached, names)
+        # кеш створюється заново для кожного повтору, щоб не міряти лише влучання з минулого разу
+        cached = min(measure(Normalizer(), names, repeat=1) for _ in range(5))
+        print(f"{unique:<14} {old * 1000:>11.1f} {single_pass * 1000:>13.1f} {cached * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# Завантаження і збереження адресної книги: json (save_to_json з indent=4) проти бінарного знімка.
+# Запуск (після "pip install -e ."): python benchmarks/bench_snapshot.py [кількість контактів]
+import os
+import sys
+import tempfile
+import time
+
+from bot_assistant.contacts import AddressBook
+from bot_assistant.snapshot import Snapshot, json_to_snapshot
+from run_suite import make_contacts, write_json
+
+
+def timed(action):
+    started = time.perf_counter()
+    result = action()
+    return time.perf_counter() - started, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as folder:
+        json_file = os.path.join(folder, "address_book.json")
+        write_json(json_file, make_contacts(count))
+        convert, _ = timed(lambda: json_to_snapshot(json_file))
+        snapshot_file = os.path.join(folder, "address_book.snap")
+        with Snapshot(snapshot_file) as snapshot:
+            rows, _ = timed(lambda: sum(1 for _ in snapshot.rows()))
+        json_load, json_book = timed(lambda: AddressBook(json_file))
+        binary_load, binary_book = timed(lambda: AddressBook(json_file, storage="binary"))
+        json_save, _ = timed(json_book.save_to_json)
+        binary_save, _ = timed(binary_book.save_to_json)
+        sizes = os.path.getsize(json_file), os.path.getsize(snapshot_file)
+    print(f"{count} contacts, json {sizes[0] / 2 ** 20:.1f} MiB, snapshot {sizes[1] / 2 ** 20:.1f} MiB")
+    print(f"convert json -> snapshot:  {convert:.3f} s")
+    print(f"decode snapshot rows:      {rows:.3f} s")
+    print(f"load:  json {json_load:.3f} s, snapshot {binary_load:.3f} s ({json_load / binary_load:.1f}x)")
+    print(f"save:  json {json_save:.3f} s, snapshot {binary_save:.3f} s ({json_save / binary_save:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Час запуску otto: імпорт bot_assistant.main і час до першого запрошення "Enter command:".
+# Otto запускається в псевдотерміналі в тимчасовій папці з адресною книгою на N контактів.
+# Запуск (після "pip install -e ."): python benchmarks/bench_startup.py [кількість контактів] [повторів]
+import json
+import os
+import pty
+import select
+import subprocess
+import sys
+import tempfile
+import time
+
+PROMPT = b"Enter command:"
+TIMEOUT = 30
+
+
+def timed_run(command):
+    started = time.perf_counter()
+    subprocess.run(command, check=True)
+    return time.perf_counter() - started
+
+
+def measure_import(repeat):
+    imported = min(timed_run([sys.executable, "-c", "import bot_assistant.main"]) for _ in range(repeat))
+    baseline = min(timed_run([sys.executable, "-c", "pass"]) for _ in range(repeat))
+    return imported, baseline
+
+
+def make_address_book(folder, count):
+    records = [{"name": f"Contact {i}", "phones": [f"{i:010d}"], "birthday": f"1990-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                "email": f"contact{i}@example.com"} for i in range(count)]
+    with open(os.path.join(folder, "address_book.json"), "w", encoding="utf-8") as fh:
+        json.dump(records, fh)
+
+
+def time_to_prompt(folder):
+    # otto читає з терміналу, тож запускаємо його в pty і чекаємо на запрошення у виводі
+    master, slave = pty.openpty()
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "bot_assistant.main"], cwd=folder,
+                               stdin=slave, stdout=slave, stderr=slave)
+    os.close(slave)
+    output = b""
+    try:
+        while PROMPT not in output:
+            if time.perf_counter() - started > TIMEOUT:
+                raise RuntimeError("otto did not show the prompt")
+            ready, _, _ = select.select([master], [], [], 0.1)
+            if ready:
+                try:
+                    output += os.read(master, 65536)
+                except OSError:
+                    raise RuntimeError(f"otto exited before showing the prompt:\n{output.decode(errors='replace')}")
+        elapsed = time.perf_counter() - started
+        os.write(master, b"exit\r")
+        # вивід треба вичитувати до кінця, інакше otto заблокується на записі в термінал
+        while process.poll() is None and time.perf_counter() - started < TIMEOUT:
+            ready, _, _ = select.select([master], [], [], 0.1)
+            if ready:
+                try:
+                    os.read(master, 65536)
+                except OSError:
+                    break
+        process.wait(TIMEOUT)
+    finally:
+        if process.poll() is None:
+            process.kill()
+        os.close(master)
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    imported, baseline = measure_import(repeat)
+    print(f"import bot_assistant.main: {imported * 1000:.0f} ms (bare interpreter {baseline * 1000:.0f} ms)")
+    with tempfile.TemporaryDirectory() as folder:
+        make_address_book(folder, count)
+        prompt = min(time_to_prompt(folder) for _ in range(repeat))
+    print(f"time to first prompt with {count} contacts: {prompt * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# Набір замірів гарячих шляхів на синтетичних даних кількох розмірів, результат - JSON,
+# щоб порівнювати коміти між собою і бачити, як кожен шлях росте з розміром даних.
+# Запуск (після "pip install -e ."):
+#   python benchmarks/run_suite.py [--sizes 1000,10000,100000] [--files 200,2000] [--repeat 5]
+#                                  [--only назва,...] [--output results.json]
+# Порівняння двох прогонів: python benchmarks/run_suite.py --compare old.json new.json
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+from datetime import date, datetime, timedelta
+
+from bot_assistant.contacts import AddressBook
+from bot_assistant.file_sorter import FileSorter
+from bot_assistant.main import ContactBot
+from bot_assistant.notebook import NoteBook
+
+SEED = 1
+SYLLABLES = ["an", "bo", "ka", "le", "mi", "na", "ol", "ra", "si", "ta", "vi", "ze", "yu", "dr", "ko"]
+WORDS = ["meeting", "budget", "report", "idea", "travel", "recipe", "book", "movie", "call", "plan",
+         "garden", "repair", "gift", "sport", "music", "doctor", "school", "car", "house", "party"]
+TAGS = ["work", "home", "family", "ideas", "shopping", "health", "finance", "hobby"]
+EXTENSIONS = ["jpg", "png", "svg", "mp4", "avi", "txt", "docx", "pdf", "xlsx", "mp3", "ogg", "wav", "py", "xyz"]
+ARCHIVE_SHARE = 20  # кожен 20-й файл дерева - архів (zip чи tar.gz) з кількома файлами
+# команди для заміру розбору і виконання рядка, як це робить main_in_bot після prompt
+DISPATCH_LINES = ["hello", "search_contacts kan", "search_note budget", "show_note meeting_1",
+                  "no_such_command", "add_email", "search_by_bd 3"]
+
+
+# ---------- синтетичні дані ----------
+
+def make_name(rng, i):
+    first = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).title()
+    last = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(3, 4))).title()
+    return f"{first} {last} {i}"
+
+
+def make_contacts(count, seed=SEED):
+    rng = random.Random(seed)
+    start = date(1950, 1, 1)
+    contacts = []
+    for i in range(count):
+        name = make_name(rng, i)
+        phones = [f"{rng.randrange(10 ** 10):010d}" for _ in range(rng.randint(1, 2))]
+        birthday = str(start + timedelta(days=rng.randrange(20000))) if i % 4 else None
+        email = f"{name.split()[0].lower()}{i}@example.com" if i % 3 else None
+        # як у save_to_json: порожні поля записуються рядком "None"
+        contacts.append({"name": name, "phones": phones, "birthday": str(birthday), "email": str(email)})
+    return contacts
+
+
+def make_notes(count, seed=SEED):
+    rng = random.Random(seed)
+    created = datetime(2024, 1, 1)
+    return [{"title": f"{rng.choice(WORDS)}_{i}", "text": " ".join(rng.choices(WORDS, k=rng.randint(5, 30))),
+             "tags": rng.sample(TAGS, rng.randint(1, 3)), "creation_date": str(created + timedelta(minutes=i))}
+            for i in range(count)]
+
+
+def write_json(filename, items):
+    # у тому ж вигляді, що й save_to_json
+    with open(filename, "w", encoding="utf-8") as fh:
+        json.dump(items, fh, ensure_ascii=False, indent=4)
+
+
+def make_tree(folder, count, seed=SEED):
+    # дерево з підпапками, файлами різних типів (частина - з кириличними іменами) і архівами
+    rng = random.Random(seed)
+    payload = b"x" * 256
+    for i in range(count):
+        sub = os.path.join(folder, *(f"dir{rng.randrange(10)}" for _ in range(rng.randint(0, 2))))
+        os.makedirs(sub, exist_ok=True)
+        stem = f"файл {i}" if i % 5 == 0 else f"file_{i}"
+        if i % ARCHIVE_SHARE == 0:
+            members = [(f"inner_{i}_{j}.{rng.choice(EXTENSIONS)}", payload) for j in range(3)]
+            if i % (ARCHIVE_SHARE * 2) == 0:
+                with zipfile.ZipFile(os.path.join(sub, f"{stem}.zip"), "w") as archive:
+                    for name, data in members:
+                        archive.writestr(name, data)
+            else:
+                with tarfile.open(os.path.join(sub, f"{stem}.tar.gz"), "w:gz") as archive:
+                    for name, data in members:
+                        source = os.path.join(folder, name)
+                        with open(source, "wb") as fh:
+                            fh.write(data)
+                        archive.add(source, arcname=name)
+                        os.remove(source)
+        else:
+            with open(os.path.join(sub, f"{stem}.{rng.choice(EXTENSIONS)}"), "wb") as fh:
+                fh.write(payload)
+
+
+# ---------- заміри ----------
+
+def measure(action, repeat, setup=None, number=1):
+    # setup() готує дані для кожного повтору і в замір не входить; number - викликів action за повтор
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        started = time.perf_counter()
+        for _ in range(number):
+            action(state)
+        times.append((time.perf_counter() - started) / number)
+    return {"min": min(times), "median": statistics.median(times), "mean": statistics.fmean(times),
+            "repeat": repeat, "number": number}
+
+
+def bench_books(folder, size, repeat):
+    contacts_file = os.path.join(folder, "address_book.json")
+    notes_file = os.path.join(folder, "note_book.json")
+    write_json(contacts_file, make_contacts(size))
+    write_json(notes_file, make_notes(size))
+    book = AddressBook(contacts_file)
+    notes = NoteBook(notes_file)
+    bot = ContactBot(book, notes)
+    rng = random.Random(SEED)
+    names = list(book.data)
+    queries = [names[rng.randrange(size)].split()[1][:4].lower() for _ in range(20)] + ["555", "12"]
+    number = 20 if size <= 10_000 else 3
+    yield "address_book.load_from_json", measure(lambda _: book.load_from_json(), repeat)
+    yield "address_book.save_to_json", measure(lambda _: book.save_to_json(), repeat)
+    binary = AddressBook(contacts_file, storage="binary")
+    binary.save_to_json()  # перше збереження створює бінарний знімок
+    yield "address_book.load_binary", measure(lambda _: binary.load_from_json(), repeat)
+    yield "address_book.save_binary", measure(lambda _: binary.save_to_json(), repeat)
+    yield "note_book.load_from_json", measure(lambda _: notes.load_from_json(), repeat)
+    yield "note_book.save_to_json", measure(lambda _: notes.save_to_json(), repeat)
+    yield "search_contacts", measure(lambda _: [bot.search_contacts(query) for query in queries], repeat, number=number)
+    yield "search_note", measure(lambda _: [bot.search_note(query) for query in
+                                            ("budget", "travel,recipe", "gift+party", "work")], repeat, number=number)
+    yield "search_by_bd", measure(lambda _: bot.search_by_bd(7), repeat, number=number)
+    yield "dispatch", measure(lambda _: [bot.execute(line) for line in DISPATCH_LINES], repeat, number=number)
+    book.close()
+    notes.close()
+
+
+def bench_sorter(folder, count, repeat):
+    source = os.path.join(folder, "source")
+    make_tree(source, count)
+    sorter = FileSorter()
+
+    def fresh_copy():
+        target = os.path.join(folder, "run")
+        shutil.rmtree(target, ignore_errors=True)
+        shutil.copytree(source, target)
+        return target
+
+    yield "file_sorter.go", measure(lambda target: sorter.go(target), repeat, setup=fresh_copy)
+    yield "file_sorter.go.sort_archives", measure(lambda target: sorter.go(target, sort_archives=True),
+                                                  repeat, setup=fresh_copy)
+    yield "file_sorter.go.workers_4", measure(lambda target: sorter.go(target, workers=4), repeat, setup=fresh_copy)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, file_counts, repeat, only=None):
+    results = []
+
+    def add(size, name, stats):
+        if only and name not in only:
+            return
+        results.append({"name": name, "size": size, **stats})
+        print(f"{name:<32} {size:>8} {stats['min'] * 1000:>12.3f} ms", file=sys.stderr)
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            for name, stats in bench_books(folder, size, repeat):
+                add(size, name, stats)
+    for count in file_counts:
+        with tempfile.TemporaryDirectory() as folder:
+            for name, stats in bench_sorter(folder, count, repeat):
+                add(count, name, stats)
+    return {"commit": git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+            "date": datetime.now().isoformat(timespec="seconds"), "seed": SEED, "results": results}
+
+
+def compare(old_file, new_file):
+    # відношення мінімальних часів: < 1 - новий коміт швидший
+    with open(old_file, encoding="utf-8") as fh:
+        old = {(item["name"], item["size"]): item for item in json.load(fh)["results"]}
+    with open(new_file, encoding="utf-8") as fh:
+        new = json.load(fh)["results"]
+    print(f"{'benchmark':<32} {'size':>8} {'old, ms':>12} {'new, ms':>12} {'ratio':>7}")
+    for item in new:
+        before = old.get((item["name"], item["size"]))
+        if before is None:
+            continue
+        print(f"{item['name']:<32} {item['size']:>8} {before['min'] * 1000:>12.3f} {item['min'] * 1000:>12.3f} "
+              f"{item['min'] / before['min']:>7.2f}")
+
+
+def int_list(value):
+    return [int(part) for part in value.split(",") if part]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for otto hot paths")
+    parser.add_argument("--sizes", type=int_list, default=[1_000, 10_000, 100_000],
+                        help="contacts and notes in the books")
+    parser.add_argument("--files", type=int_list, default=[200, 2_000], help="files in the tree for FileSorter.go")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", type=lambda value: set(value.split(",")), help="run only these benchmarks")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two JSON results")
+    args = parser.parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return
+    # команди на кшталт search_by_bd друкують результат самі - в замірах він не потрібен
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        report = json.dumps(run(args.sizes, args.files, args.repeat, args.only), indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import lzma
+import tarfile
+import tempfile
+import zipfile
+import zlib
+from collections import Counter
+from pathlib import Path
+from bot_assistant.sort_plan import numbered_name
+
+# ліміти одного розпакування (разом з вкладеними архівами) - захист від zip-бомб
+MAX_TOTAL_SIZE = 1024 * 1024 * 1024
+MAX_MEMBERS = 10_000
+MAX_DEPTH = 3
+
+CHUNK_SIZE = 1024 * 1024
+# вкладений архів до цього розміру розпаковується з пам'яті, більший - через тимчасовий файл
+SPOOL_SIZE = 16 * 1024 * 1024
+NESTED_EXTENSIONS = ('.zip', '.tar', '.gz', '.tgz')
+
+# пошкоджений архів або не архів зовсім
+BROKEN_ARCHIVE = (zipfile.BadZipFile, tarfile.TarError, EOFError, zlib.error, lzma.LZMAError)
+
+
+class ArchiveLimitError(ValueError):
+    pass
+
+
+def member_parts(name: str):
+    # частини шляху члена архіву; None, якщо шлях веде за межі папки розпакування
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+    if ".." in parts:
+        return None
+    return parts
+
+
+def archive_stem(name: str) -> str:
+    stem = name.rpartition(".")[0] or name
+    if stem.lower().endswith(".tar"):
+        stem = stem[:-len(".tar")]
+    return stem
+
+
+class Extraction:
+    # стан одного розпакування: скільки вже прочитано і що створено
+    def __init__(self):
+        self.size = 0
+        self.members = 0
+        self.files = []
+        self.folders = []
+        self.known_folders = set()
+        self.counts = Counter()
+
+    def mark(self):
+        return len(self.files), len(self.folders)
+
+    def rollback(self, mark=(0, 0)):
+        # прибирає все, що створено після mark: після невдалого вкладеного архіву - лише його файли
+        files, folders = mark
+        for path in reversed(self.files[files:]):
+            path.unlink(missing_ok=True)
+        for folder in reversed(self.folders[folders:]):
+            self.known_folders.discard(folder)
+            try:
+                folder.rmdir()
+            except OSError:
+                pass
+        del self.files[files:]
+        del self.folders[folders:]
+
+
+class ArchiveExtractor:
+    # розпаковує zip і tar (у т.ч. стиснені) по одному члену, не довіряючи розмірам
+    # із заголовків: рахуються фактично прочитані байти.
+    # place(name) -> (категорія, шлях) - якщо задано, члени архіву одразу сортуються
+    # по категоріях замість розпакування в окрему папку
+    def __init__(self, max_size=MAX_TOTAL_SIZE, max_members=MAX_MEMBERS, max_depth=MAX_DEPTH, place=None):
+        self.max_size = max_size
+        self.max_members = max_members
+        self.max_depth = max_depth
+        self.place = place
+
+    def extract(self, archive: Path, folder: Path):
+        # Counter категорій розсортованих членів (порожній без place);
+        # None - якщо архів пошкоджений або перевищує ліміти, тоді архів лишається на місці
+        state = Extraction()
+        try:
+            with open(archive, "rb") as fh:
+                self.extract_stream(fh, folder, state, 0)
+        except (ArchiveLimitError, *BROKEN_ARCHIVE):
+            state.rollback()
+            return None
+        except BaseException:
+            state.rollback()
+            raise
+        archive.unlink()
+        return state.counts
+
+    def extract_stream(self, fh, folder: Path, state: Extraction, depth: int):
+        if zipfile.is_zipfile(fh):
+            fh.seek(0)
+            with zipfile.ZipFile(fh) as archive:
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    self.check(state, info.file_size)
+                    with archive.open(info) as member:
+                        self.write_member(member, info.filename, folder, state, depth)
+        else:
+            fh.seek(0)
+            # "r|*" читає tar послідовно, не шукаючи по файлу
+            with tarfile.open(fileobj=fh, mode="r|*") as archive:
+                for info in archive:
+                    # папки створюються разом з файлами, посилання і пристрої пропускаємо
+                    if not info.isfile():
+                        continue
+                    self.check(state, info.size)
+                    self.write_member(archive.extractfile(info), info.name, folder, state, depth)
+
+    def check(self, state: Extraction, declared_size: int):
+        state.members += 1
+        if state.members > self.max_members:
+            raise ArchiveLimitError(f"more than {self.max_members} files in archive")
+        if state.size + declared_size > self.max_size:
+            raise ArchiveLimitError(f"archive is larger than {self.max_size} bytes")
+
+    def write_member(self, source, name: str, folder: Path, state: Extraction, depth: int):
+        parts = member_parts(name)
+        if not parts:
+            return
+        if depth < self.max_depth and parts[-1].lower().endswith(NESTED_EXTENSIONS):
+            with tempfile.SpooledTemporaryFile(SPOOL_SIZE) as nested:
+                self.copy(source, nested, state)
+                mark = state.mark()
+                counts = state.counts.copy()
+                try:
+                    self.extract_stream(nested, folder.joinpath(*parts[:-1], archive_stem(parts[-1])), state, depth + 1)
+                    return
+                except BROKEN_ARCHIVE:
+                    # не архів, хоч і з таким розширенням - зберігаємо як звичайний файл
+                    state.rollback(mark)
+                    state.counts = counts
+                nested.seek(0)
+                with self.output(parts, folder, state) as target:
+                    for chunk in iter(lambda: nested.read(CHUNK_SIZE), b""):
+                        target.write(chunk)
+            return
+        with self.output(parts, folder, state) as target:
+            self.copy(source, target, state)
+
+    def copy(self, source, target, state: Extraction):
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+            state.size += len(chunk)
+            if state.size > self.max_size:
+                raise ArchiveLimitError(f"archive is larger than {self.max_size} bytes")
+            target.write(chunk)
+
+    def output(self, parts: list, folder: Path, state: Extraction):
+        if self.place is None:
+            path = folder.joinpath(*parts)
+        else:
+            category, path = self.place(parts[-1])
+            state.counts[category] += 1
+        self.make_folder(path.parent, state)
+        # "xb" не перезаписує наявний файл: при збігу імені додаємо номер
+        candidate = path
+        number = 1
+        while True:
+            try:
+                target = open(candidate, "xb")
+            except FileExistsError:
+                candidate = path.with_name(numbered_name(path.name, number))
+                number += 1
+                continue
+            state.files.append(candidate)
+            return target
+
+    def make_folder(self, folder: Path, state: Extraction):
+        if folder in state.known_folders:
+            return
+        missing = []
+        current = folder
+        while not current.exists():
+            missing.append(current)
+            current = current.parent
+        for path in reversed(missing):
+            path.mkdir(exist_ok=True)
+            state.folders.append(path)
+        state.known_folders.add(folder)
@@ -0,0 +1,54 @@
+import sys
+import threading
+
+
+class AutoSaver:
+    # фоновий потік, що зберігає змінені книги. Після першої зміни він чекає interval секунд,
+    # тож серія змін записується одним атомарним записом, а не окремим записом на кожну зміну.
+    # lock - замок бота: знімок книги робиться під ним, а запис на диск - вже поза ним
+    def __init__(self, lock, interval):
+        self.lock = lock
+        self.interval = interval
+        self.books = []
+        self.changed = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def watch(self, book):
+        book.on_change = self.changed.set
+        self.books.append(book)
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="otto-autosave", daemon=True)
+            self.thread.start()
+        if book.changes:
+            self.changed.set()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.changed.wait()
+            # зміни, що прийдуть за цей час, збережуться разом з першою
+            if self.stopped.wait(self.interval):
+                return
+            self.changed.clear()
+            self.save()
+
+    def save(self):
+        with self.lock:
+            if self.stopped.is_set():
+                return
+            writes = [(book, book.checkpoint()) for book in self.books if book.changes]
+        for book, write in writes:
+            if write is None:
+                continue
+            try:
+                write()
+            except OSError as error:
+                # наприклад, закінчилось місце на диску - спробуємо ще раз через interval
+                print(f"Autosave of {book.filename} failed: {error}", file=sys.stderr)
+                book.changes += 1
+                self.changed.set()
+
+    # після stop книги зберігає лише close бота; потік не чекаємо - він може якраз чекати на замок бота
+    def stop(self):
+        self.stopped.set()
+        self.changed.set()
@@ -0,0 +1,77 @@
+class Command:
+    # команда бота: обробник, розбір аргументів і рядок довідки.
+    # parse(rest) отримує все, що після назви команди, і повертає кортеж аргументів обробника;
+    # ValueError з повідомленням повертається користувачу, без повідомлення - підказка usage
+    def __init__(self, name, handler, parse, args="", description="", group=None, aliases=()):
+        self.name = name
+        self.handler = handler
+        self.parse = parse
+        self.args = args
+        self.description = description
+        self.group = group
+        self.aliases = aliases
+
+    @property
+    def usage(self):
+        return f"{self.name} {self.args}".strip()
+
+    @property
+    def help(self):
+        if self.args:
+            return f"{self.name}: {self.args}: {self.description}"
+        return f"{self.name}: {self.description}"
+
+
+# готові способи розбору аргументів
+def raw_args(rest):
+    return (rest,)
+
+
+def stripped_args(rest):
+    return (rest.strip(),)
+
+
+def no_args(rest):
+    if rest.strip():
+        raise ValueError()
+    return ()
+
+
+class CommandRegistry:
+    # назва (або синонім) команди -> Command; пошук команди - один запит до словника,
+    # а список команд, довідка і автодоповнення будуються з реєстру
+    def __init__(self):
+        self.commands = {}
+        self.primary = []
+
+    def command(self, name, args="", description="", parse=raw_args, group=None, aliases=()):
+        # декоратор для методів бота
+        def register(handler):
+            self.add(Command(name, handler, parse, args, description, group, aliases))
+            return handler
+        return register
+
+    def add(self, command):
+        for key in (command.name, *command.aliases):
+            if key in self.commands:
+                raise ValueError(f"Command '{key}' is already registered")
+            self.commands[key] = command
+        self.primary.append(command)
+
+    def names(self):
+        return [command.name for command in self.primary]
+
+    def help(self, group=None):
+        return "\n".join(command.help for command in self.primary if group is None or command.group == group)
+
+    def find(self, line):
+        # (Command, решта рядка) або (None, рядок); спершу весь рядок - для синонімів
+        # з пробілами на кшталт "good bye", потім перше слово
+        command = self.commands.get(line.strip().lower())
+        if command is not None:
+            return command, ""
+        name, _, rest = line.lstrip().partition(" ")
+        command = self.commands.get(name.lower())
+        if command is None:
+            return None, line
+        return command, rest
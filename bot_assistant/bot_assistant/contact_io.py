@@ -0,0 +1,191 @@
+import csv
+import gc
+import json
+import os
+from contextlib import nullcontext
+from datetime import date
+from bot_assistant.contacts import EMAIL_RE, LOAD_BATCH, parse_date
+from bot_assistant.json_stream import batched
+
+# колонки CSV; кілька телефонів в одній клітинці розділяються ";"
+FIELDS = ("name", "phones", "email", "birthday")
+PHONE_SEPARATOR = ";"
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+# скільки відхилених рядків показати у відповіді, решта - у файлі звіту
+REPORT_LIMIT = 10
+
+
+def file_format(filename):
+    return FORMATS.get(os.path.splitext(filename)[1].lower())
+
+
+def empty_to_none(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value or value.lower() == "none":
+        return None
+    return value
+
+
+def make_record(item, record_class, today=None):
+    # перевіряє рядок імпорту і будує запис; ValueError пояснює, що не так.
+    # Поля перевіряються тут самі, а запис будується з уже перевірених значень:
+    # record_class(name) створював би кожне поле двічі
+    name = empty_to_none(item.get("name"))
+    if name is None:
+        raise ValueError("missing name")
+    phones = item.get("phones") or []
+    if isinstance(phones, str):
+        phones = [phone.strip() for phone in phones.split(PHONE_SEPARATOR) if phone.strip()]
+    else:
+        phones = list(phones)
+    for phone in phones:
+        if not (isinstance(phone, str) and len(phone) == 10 and phone.isdigit()):
+            raise ValueError(f"invalid phone '{phone}'")
+    email = empty_to_none(item.get("email"))
+    if email is not None and not EMAIL_RE.match(email):
+        raise ValueError(f"invalid email '{email}'")
+    birthday = empty_to_none(item.get("birthday"))
+    birth_date = None
+    if birthday is not None:
+        try:
+            birth_date = parse_date(birthday)
+        except ValueError:
+            raise ValueError(f"invalid birthday '{birthday}'")
+        if birth_date > (today or date.today()):
+            raise ValueError(f"invalid birthday '{birthday}'")
+    return record_class.from_trusted(name, phones, email, birth_date)
+
+
+def read_rows(fh, file_type):
+    # (номер рядка, словник з полями або None, якщо рядок не розібрався)
+    if file_type == "csv":
+        reader = csv.DictReader(fh)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(fh, 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            yield number, None
+            continue
+        yield number, item if isinstance(item, dict) else None
+
+
+class ImportResult:
+    def __init__(self, filename):
+        self.filename = filename
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []     # перші REPORT_LIMIT відхилених рядків
+        self.report = f"{filename}.rejected.txt"   # файл з усіма відхиленими рядками
+        self.report_file = None
+        if os.path.exists(self.report):
+            os.remove(self.report)  # звіт від попереднього імпорту цього файлу
+
+    def reject(self, number, reason):
+        self.rejected += 1
+        if len(self.errors) < REPORT_LIMIT:
+            self.errors.append(f"line {number}: {reason}")
+        if self.report_file is None:
+            self.report_file = open(self.report, "w", encoding="utf-8")
+        self.report_file.write(f"{number}\t{reason}\n")
+
+    def close(self):
+        if self.report_file is not None:
+            self.report_file.close()
+
+    def __str__(self):
+        lines = [f"Imported {self.imported} contacts, rejected {self.rejected} rows."]
+        lines.extend(self.errors)
+        if self.rejected > len(self.errors):
+            lines.append(f"... see {self.report} for all rejected rows")
+        return "\n".join(lines)
+
+
+def import_contacts(book, filename, lock=None):
+    # рядки читаються потоком, а перевірені записи додаються в книгу пакетами.
+    # Відхиляються рядки з помилками, телефоном, що вже є в книзі чи раніше у файлі,
+    # та іменем, що вже є в книзі. lock - замок бота: він береться на кожен пакет окремо,
+    # тож поміж пакетами інші команди (наприклад, інших клієнтів сервера) не чекають кінця імпорту
+    file_type = file_format(filename)
+    if file_type is None:
+        raise ValueError(f"Unknown file format, use one of: {', '.join(FORMATS)}")
+    lock = lock or nullcontext()
+    result = ImportResult(filename)
+    seen_names = set()
+    seen_phones = set()
+    today = date.today()
+    # мільйони нових об'єктів без сміття: збирач лише даремно обходив би їх знову й знову
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(filename, "r", encoding="utf-8", newline="") as fh:
+            for rows in batched(read_rows(fh, file_type), LOAD_BATCH):
+                with lock:
+                    batch = []
+                    for number, item in rows:
+                        record = check_row(book, result, number, item, today, seen_names, seen_phones)
+                        if record is not None:
+                            batch.append(record)
+                    if batch:
+                        book.add_records(batch)
+                        result.imported += len(batch)
+    finally:
+        result.close()
+        if gc_enabled:
+            gc.enable()
+    return result
+
+
+def check_row(book, result, number, item, today, seen_names, seen_phones):
+    # запис для рядка number або None, якщо рядок відхилено
+    if item is None:
+        result.reject(number, "invalid JSON")
+        return None
+    try:
+        record = make_record(item, book.record_class, today)
+    except ValueError as error:
+        result.reject(number, str(error))
+        return None
+    name = record.name.value
+    if name in seen_names or name in book.data:
+        result.reject(number, f"contact '{name}' already exists")
+        return None
+    duplicate = next((phone for phone in record.phones
+                      if phone in seen_phones or book.index.find_phone(phone) is not None), None)
+    if duplicate is not None:
+        result.reject(number, f"phone {duplicate} already exists")
+        return None
+    seen_names.add(name)
+    seen_phones.update(record.phones)
+    return record
+
+
+def export_contacts(book, filename, lock=None):
+    # під замком бота (lock) лише копіюються поля контактів, а файл пишеться вже без нього
+    file_type = file_format(filename)
+    if file_type is None:
+        raise ValueError(f"Unknown file format, use one of: {', '.join(FORMATS)}")
+    with lock or nullcontext():
+        rows = [(record.name.value, list(record.phones), record.email.value, record.birthday.value)
+                for record in book.data.values()]
+    count = 0
+    temp_name = f"{filename}.tmp"
+    with open(temp_name, "w", encoding="utf-8", newline="") as fh:
+        writer = csv.writer(fh) if file_type == "csv" else None
+        if writer is not None:
+            writer.writerow(FIELDS)
+        for name, phones, email, birthday in rows:
+            if writer is not None:
+                writer.writerow((name, PHONE_SEPARATOR.join(phones), email or "", birthday or ""))
+            else:
+                fh.write(json.dumps({"name": name, "phones": phones,
+                                     "email": email, "birthday": birthday}, ensure_ascii=False) + "\n")
+            count += 1
+    os.replace(temp_name, filename)
+    return count
@@ -1,10 +1,32 @@
-import json
+import gc
 import re
-from datetime import datetime
-from collections import UserDict
+from bisect import bisect_left, insort
+from calendar import isleap
+from datetime import date, datetime, timedelta
+from collections import UserDict, defaultdict
+from functools import lru_cache
+from bot_assistant.instrumentation import STATS, measured_io
+from bot_assistant.json_stream import batched
+from bot_assistant.storage import make_storage
+
+EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+# скільки записів додається в індекс за раз при завантаженні та імпорті
+LOAD_BATCH = 10_000
+# наступний день народження будь-якого контакту - не далі ніж за рік,
+# тож довше вікно пошуку днів народження нічого не додає
+MAX_BIRTHDAY_WINDOW = 366
+
+
+@lru_cache(maxsize=65536)
+def parse_date(value):
+    # у великих книгах дати народження часто повторюються, тож strptime для кожної викликається один раз
+    return datetime.strptime(value, '%Y-%m-%d').date()
 
 
 class Field:
+    # __slots__ замість __dict__: контактів може бути мільйони, і кожен байт на об'єкт помітний
+    __slots__ = ("__value",)
+
     def __init__(self, value):
         if not self.is_valid(value):
             raise ValueError("Invalid value")
@@ -16,6 +38,13 @@ class Field:
     def is_valid(self, value):
         return True
 
+    # значення вже перевірене раніше (наприклад, при записі знімка) - без повторної перевірки
+    @classmethod
+    def trusted(cls, value):
+        field = cls.__new__(cls)
+        field.__value = value
+        return field
+
     @property
     def value(self):
         return self.__value
@@ -28,10 +57,12 @@ class Field:
 
 
 class Name(Field):
-    pass
+    __slots__ = ()
 
 
 class Phone(Field):
+    __slots__ = ()
+
     def is_valid(self, value):
         return len(value) == 10 and value.isdigit()
 
@@ -40,32 +71,53 @@ class Phone(Field):
 
 
 class Birthday(Field):
+    __slots__ = ("date",)
+
     def __init__(self, value=None):
+        self.date = None  # розібрана дата, щоб не викликати strptime повторно
         if value:
-            self._validate_birthday_format(value)
+            self.date = self._parse_birthday(value)
         super().__init__(value)
 
-    def _validate_birthday_format(self, value):
-        date_today = datetime.now().date()
-        if value.lower() != 'none':
-            try:
-                datetime.strptime(value, '%Y-%m-%d')
-            except ValueError:
-                raise ValueError
-            if date_today < datetime.strptime(value, '%Y-%m-%d').date():
-                raise ValueError
-            else:
-                return True
+    @classmethod
+    def trusted(cls, value, birth_date=None):
+        field = super().trusted(value)
+        field.date = birth_date
+        return field
+
+    def _parse_birthday(self, value):
+        if value.lower() == 'none':
+            return None
+        try:
+            birth_date = parse_date(value)
+        except ValueError:
+            raise ValueError
+        if date.today() < birth_date:
+            raise ValueError
+        return birth_date
 
     def value_as_datetime(self):
-        if self.value:
-            if self.value.lower() == 'none':
-                return None
-            return datetime.strptime(self.value, '%Y-%m-%d')
-        return None
+        if self.date is None:
+            return None
+        return datetime(self.date.year, self.date.month, self.date.day)
+
+
+def birthday_in_year(birth_date, year):
+    # 29 лютого в невисокосний рік святкуємо 28 лютого
+    if birth_date.month == 2 and birth_date.day == 29 and not isleap(year):
+        return date(year, 2, 28)
+    return birth_date.replace(year=year)
+
+
+def next_birthday(birth_date, today):
+    upcoming = birthday_in_year(birth_date, today.year)
+    if upcoming < today:
+        upcoming = birthday_in_year(birth_date, today.year + 1)
+    return upcoming
 
 
 class Email(Field):
+    __slots__ = ()
 
     def __init__(self, value):
         super().__init__(value)
@@ -74,41 +126,95 @@ class Email(Field):
         if value is None:
             return True
         if isinstance(value, str):
-            email_regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-            if re.match(email_regex, value):
+            if EMAIL_RE.match(value):
                 return True
         return False
 
 
 class Record:
+    __slots__ = ("book", "name", "phones", "_birthday", "_email", "__weakref__")
+
     def __init__(self, name, birthday=None, email=None):
+        self.book = None  # адресна книга, індекси якої треба оновлювати при змінах
         self.name = Name(name)
         self.phones = []
-        self.birthday = Birthday(birthday)
-        self.email = Email(email)
+        self._birthday = Birthday(birthday)
+        self._email = Email(email)
+
+    @property
+    def birthday(self):
+        return self._birthday
+
+    @birthday.setter
+    def birthday(self, birthday):
+        self._birthday = birthday
+        self.changed("birthday")
+
+    @property
+    def email(self):
+        return self._email
+
+    @email.setter
+    def email(self, email):
+        self._email = email
+        self.changed("email")
+
+    def changed(self, op):
+        if self.book is not None:
+            self.book.record_changed(self, op)
 
     def add_phone(self, phone):
         self.phones.append(str(phone))
+        self.changed("phone")
 
     def remove_phone(self, phone):
         self.phones.remove(phone)
+        self.changed("phone")
 
     def edit_phone(self, old_phone, new_phone):
         index = self.phones.index(old_phone)
         self.phones[index] = new_phone
+        self.changed("phone")
 
     def find_phone(self, phone):
         return phone in self.phones
 
-    def days_to_birthday(self):
-        if not self.birthday.value:
+    def to_dict(self):
+        return {"name": self.name.value,
+                "phones": list(self.phones),
+                "email": str(self.email),
+                "birthday": str(self.birthday)}
+
+    # запис з уже перевірених даних: дата народження вже розібрана, а її рядок - у форматі YYYY-MM-DD
+    @classmethod
+    def from_trusted(cls, name, phones, email, birth_date):
+        record = cls.__new__(cls)
+        record.book = None
+        record.name = Name.trusted(name)
+        record.phones = phones
+        record._email = Email.trusted(email)
+        record._birthday = Birthday.trusted(birth_date.isoformat() if birth_date else None, birth_date)
+        return record
+
+    @classmethod
+    def from_dict(cls, item):
+        record = cls(item['name'])
+        record.phones.extend(item['phones'])
+        email_value = item['email']
+        if email_value.lower() == 'none':
+            email_value = None
+        record.email = Email(email_value)
+        birthday_value = item['birthday']
+        if birthday_value.lower() == 'none':
+            birthday_value = None
+        record.birthday = Birthday(birthday_value)
+        return record
+
+    def days_to_birthday(self, today=None):
+        if self.birthday.date is None:
             return None
-        today = datetime.today()
-        next_birthday = datetime(today.year, self.birthday.value_as_datetime().month, self.birthday.value_as_datetime().day)
-        if next_birthday < today:
-            next_birthday = datetime(today.year + 1, self.birthday.value_as_datetime().month, self.birthday.value_as_datetime().day)
-        delta = next_birthday - today
-        return delta.days
+        today = today or date.today()
+        return (next_birthday(self.birthday.date, today) - today).days
 
     def __str__(self):
         phone_info = f"Phones: {', '.join(self.phones)}"
@@ -117,24 +223,279 @@ class Record:
         return f"Contact name: {self.name.value}, {phone_info}, {email_info}, {birthday_info}"
 
 
+class ContactIndex:
+    NGRAM = 3
+
+    def __init__(self):
+        self.phones = {}                # телефон -> ім'я контакту
+        self.emails = defaultdict(set)  # email -> імена контактів
+        self.grams = None               # n-грама імені чи телефону -> імена контактів, див. search_grams
+        self.birthdays = []             # (місяць, день, ім'я), див. sorted_birthdays
+        self.birthdays_unsorted = False
+        self.keys = {}                  # ім'я -> (ім'я в нижньому регістрі, телефони, email, день народження)
+
+    def clear(self):
+        self.phones.clear()
+        self.emails.clear()
+        self.grams = None
+        self.birthdays.clear()
+        self.birthdays_unsorted = False
+        self.keys.clear()
+
+    @classmethod
+    def ngrams(cls, text):
+        if len(text) <= cls.NGRAM:
+            return {text}
+        return {text[i:i + cls.NGRAM] for i in range(len(text) - cls.NGRAM + 1)}
+
+    def add(self, record):
+        birthday = self._add_keys(record)
+        if birthday:
+            insort(self.sorted_birthdays(), birthday)
+
+    def add_many(self, records):
+        # як add для кожного запису, але дні народження не вставляються в середину списку для кожного,
+        # а сортуються пізніше всі разом (див. sorted_birthdays). З однаковим ім'ям лишається останній запис
+        latest = {record.name.value: record for record in records}
+        for name in latest:
+            if name in self.keys:
+                self.remove(name)
+        for record in latest.values():
+            birthday = self._add_keys(record)
+            if birthday:
+                self.birthdays.append(birthday)
+                self.birthdays_unsorted = True
+
+    def _add_keys(self, record):
+        name = record.name.value
+        lower_name = name.lower()
+        phones = tuple(record.phones)
+        email = record.email.value.lower() if record.email.value else None
+        birth_date = record.birthday.date
+        birthday = (birth_date.month, birth_date.day, name) if birth_date else None
+        self.keys[name] = (lower_name, phones, email, birthday)
+        for phone in phones:
+            self.phones[phone] = name
+        if email:
+            self.emails[email].add(name)
+        if self.grams is not None:
+            self._add_grams(name, lower_name, phones)
+        return birthday
+
+    def _add_grams(self, name, lower_name, phones):
+        for text in (lower_name, *phones):
+            for gram in self.ngrams(text):
+                self.grams[gram].add(name)
+
+    def sorted_birthdays(self):
+        # add_many лише дописує дні народження в кінець, а сортуються вони один раз,
+        # коли знадобляться: при завантаженні й імпорті пакетами список не пересортовується після кожного пакета
+        if self.birthdays_unsorted:
+            self.birthdays.sort()
+            self.birthdays_unsorted = False
+        return self.birthdays
+
+    def search_grams(self):
+        # n-грамний індекс - найдорожча частина завантаження книги, тож він будується
+        # при першому пошуку, а далі оновлюється разом з рештою індексу
+        if self.grams is None:
+            self.grams = defaultdict(set)
+            for name, (lower_name, phones, _, _) in self.keys.items():
+                self._add_grams(name, lower_name, phones)
+        return self.grams
+
+    def remove(self, name):
+        keys = self.keys.pop(name, None)
+        if keys is None:
+            return
+        lower_name, phones, email, birthday = keys
+        for phone in phones:
+            if self.phones.get(phone) == name:
+                del self.phones[phone]
+        if email:
+            self._discard(self.emails, email, name)
+        if birthday:
+            birthdays = self.sorted_birthdays()
+            del birthdays[bisect_left(birthdays, birthday)]
+        if self.grams is not None:
+            for text in (lower_name, *phones):
+                for gram in self.ngrams(text):
+                    self._discard(self.grams, gram, name)
+
+    def update(self, record):
+        self.remove(record.name.value)
+        self.add(record)
+
+    @staticmethod
+    def _discard(index, key, name):
+        names = index.get(key)
+        if names:
+            names.discard(name)
+            if not names:
+                del index[key]
+
+    def find_phone(self, phone):
+        return self.phones.get(phone)
+
+    def find_email(self, email):
+        return self.emails.get(email.lower(), set())
+
+    def search(self, query):
+        query = query.lower()
+        if not query:
+            return set(self.keys)
+        index = self.search_grams()
+        if len(query) >= self.NGRAM:
+            # кандидати - перетин списків для всіх n-грам запиту
+            grams = sorted(self.ngrams(query), key=lambda gram: len(index.get(gram, ())))
+            candidates = set(index.get(grams[0], ()))
+            for gram in grams[1:]:
+                if not candidates:
+                    break
+                candidates &= index.get(gram, set())
+        else:
+            # короткий запит - перебираємо n-грами, а не контакти
+            candidates = set()
+            for gram, names in index.items():
+                if query in gram:
+                    candidates |= names
+        if STATS.enabled:
+            STATS.scanned("search_contacts", len(candidates))
+        return {name for name in candidates if self._matches(name, query)}
+
+    def birthdays_between(self, first, last):
+        # імена з днем народження від first до last включно, (місяць, день)
+        birthdays = self.sorted_birthdays()
+        start = bisect_left(birthdays, first)
+        stop = bisect_left(birthdays, (last[0], last[1] + 1))
+        return [name for _, _, name in birthdays[start:stop]]
+
+    def _matches(self, name, query):
+        lower_name, phones, _, _ = self.keys[name]
+        return query in lower_name or any(query in phone for phone in phones)
+
+
 class AddressBook(UserDict):
-    def __init__(self, filename):
+    # storage: "json" - весь файл перезаписується при збереженні,
+    # "journal" - зміни дописуються в журнал, "sqlite" - контакти читаються з бази
+    # за потреби, "binary" - бінарний знімок, "mapped" - контакти читаються зі знімка
+    # через mmap за потреби (див. storage.py)
+    record_class = Record
+
+    def __init__(self, filename, storage="json"):
         self.filename = filename
+        self.index = ContactIndex()
+        self.storage = make_storage(storage, filename)
+        self.changes = 0        # змін з останнього збереження (див. autosave.py)
+        self.on_change = None   # викликається після кожної зміни
         super().__init__()
         self.load_from_json()
 
+    def __setitem__(self, name, record):
+        self.add_record(record)
+
+    def __delitem__(self, name):
+        record = self.data.pop(name)
+        record.book = None
+        self.index.remove(name)
+        self.storage.log(self, "delete", name)
+        self.touch()
+
+    def _attach(self, record):
+        name = record.name.value
+        previous = self.data.get(name)
+        if previous is not None and previous is not record:
+            previous.book = None
+        record.book = self
+        self.data[name] = record
+        self.index.update(record)
+
+    def _attach_many(self, records):
+        for record in records:
+            name = record.name.value
+            previous = self.data.get(name)
+            if previous is not None and previous is not record:
+                previous.book = None
+            record.book = self
+            self.data[name] = record
+        self.index.add_many(records)
+
     def add_record(self, record):
-        self.data[record.name.value] = record
+        self._attach(record)
+        self.storage.log(self, "add", record.name.value, record.to_dict())
+        self.touch()
+
+    # як add_record для кожного запису, але індекс і сховище оновлюються одним пакетом
+    def add_records(self, records):
+        if self.storage.lazy:
+            self.storage.put_many(records)
+        else:
+            self._attach_many(records)
+            self.storage.log_many(self, "add", records)
+        self.touch()
+
+    def record_changed(self, record, op):
+        self.index.update(record)
+        self.storage.log(self, op, record.name.value, record.to_dict())
+        self.touch()
+
+    def rename(self, old_name, new_name):
+        # інакше запис під new_name зник би з книги, а його телефони й день народження лишились би в індексі
+        if new_name != old_name and new_name in self.data:
+            raise ValueError(f"Contact '{new_name}' already exists")
+        record = self.data.pop(old_name)
+        self.index.remove(old_name)
+        record.name = Name(new_name)
+        self.data[new_name] = record
+        self.index.add(record)
+        self.storage.log(self, "rename", old_name, record.to_dict())
+        self.touch()
+        return record
 
     def find(self, name):
         return self.data.get(name)
 
+    def find_by_phone(self, phone):
+        name = self.index.find_phone(phone)
+        return self.data.get(name) if name is not None else None
+
+    def find_by_email(self, email):
+        return [self.data[name] for name in sorted(self.index.find_email(email))]
+
+    def search(self, query):
+        return [self.data[name] for name in sorted(self.index.search(query))]
+
+    def upcoming_birthdays(self, days, today=None):
+        # пошук по діапазону в індексі; діапазон, що переходить через кінець року, ділимо на частини
+        today = today or date.today()
+        end = today + timedelta(days=min(days, MAX_BIRTHDAY_WINDOW))
+        found = []
+        seen = set()  # вікно від року і довше охоплює кілька днів народження контакту - лишаємо найближчий
+        start = today
+        while start <= end:
+            stop = min(end, date(start.year, 12, 31))
+            last = (stop.month, stop.day)
+            if last == (2, 28) and not isleap(start.year):
+                last = (2, 29)
+            for name in self.index.birthdays_between((start.month, start.day), last):
+                if name in seen:
+                    continue
+                seen.add(name)
+                record = self.data[name]
+                days_left = (birthday_in_year(record.birthday.date, start.year) - today).days
+                found.append((record, days_left))
+            start = date(start.year + 1, 1, 1)
+        if STATS.enabled:
+            STATS.scanned("search_by_bd", len(found))
+        found.sort(key=lambda item: (item[1], item[0].name.value))
+        return found
+
     def delete(self, name):
         if len(name) <= 1:
             raise ValueError
         stripped_name = name.strip()
         if stripped_name in self.data:
-            del self.data[stripped_name]
+            del self[stripped_name]
             print(f"Contact {stripped_name} deleted")
         else:
             print('no data found')
@@ -142,41 +503,69 @@ class AddressBook(UserDict):
     def __iter__(self):
         return self.iterator()
 
-    def iterator(self, part_record=1):
-        records = list(self.data.values())
-        num_records = len(records)
-        current_index = 0
-        while current_index < num_records:
-            yield records[current_index:current_index + part_record]
-            current_index += part_record
+    # from_file=True - записи читаються прямо зі сховища по одному,
+    # без завантаження всієї книги в пам'ять
+    def iterator(self, part_record=1, from_file=False):
+        if from_file:
+            records = (self.record_class.from_dict(item) for item in self.storage.iter_items())
+        else:
+            records = self.data.values()
+        yield from batched(records, part_record)
+
+    def dump(self):
+        return [record.to_dict() for record in self.data.values()]
 
+    def touch(self):
+        self.changes += 1
+        if self.on_change is not None:
+            self.on_change()
+
+    # знімок для автозбереження: функція, що допише його на диск, або None, якщо все вже записано
+    def checkpoint(self):
+        self.changes = 0
+        return self.storage.checkpoint(self)
+
+    @measured_io("save")
     def save_to_json(self):
-        with open(self.filename, "w") as fh:
-            json.dump([{"name": record.name.value,
-                        "phones": record.phones,
-                        "email": str(record.email),
-                        "birthday": str(record.birthday)} for record in self.data.values()], fh, indent=4)
+        self.changes = 0
+        self.storage.save(self)
+
+    # гарантує, що вже зроблені зміни збережені на диску
+    @measured_io("flush")
+    def flush(self):
+        self.storage.flush(self)
 
+    def close(self):
+        self.storage.close()
+
+    @measured_io("load")
     def load_from_json(self):
+        self.changes = 0
+        if self.storage.lazy:
+            self.data, self.index = self.storage.open(self)
+            return
+        # при завантаженні створюються лише нові об'єкти, тож збирач сміття тут нічого не знайде
+        gc_enabled = gc.isenabled()
+        gc.disable()
         try:
-            with open(self.filename, "r") as fh:
-                data = json.load(fh)
-                if not data:
-                    return "The JSON file is empty."
-                else:
+            if self.storage.prevalidated:
+                records = self.storage.load_records(self.record_class)
+                if records is not None:
+                    self.data.clear()
+                    self.index.clear()
+                    self._attach_many(records)
+                    return
+            loaded = False
+            for items in batched(self.storage.load(), LOAD_BATCH):
+                if not loaded:
                     self.data.clear()
-                    for item in data:
-                        record = Record(item['name'])
-                        for phone in item['phones']:
-                            record.add_phone(phone)
-                        email_value = item['email']
-                        if email_value.lower() == 'none':
-                            email_value = None
-                        record.email = Email(email_value)
-                        birthday_value = item['birthday']
-                        if birthday_value.lower() == 'none':
-                            birthday_value = None
-                        record.birthday = Birthday(birthday_value)
-                        self.add_record(record)
+                    self.index.clear()
+                    loaded = True
+                self._attach_many([self.record_class.from_dict(item) for item in items])
+            if not loaded:
+                return "The JSON file is empty."
         except FileNotFoundError:
             return "File not found. Creating a new address book."
+        finally:
+            if gc_enabled:
+                gc.enable()
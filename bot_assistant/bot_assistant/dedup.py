@@ -0,0 +1,77 @@
+import hashlib
+import mmap
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+PARTIAL_SIZE = 64 * 1024
+CHUNK_SIZE = 1024 * 1024
+MMAP_SIZE = 16 * 1024 * 1024
+# скільки потоків хешують файли; хешування впирається в диск, тож потоки корисні незалежно від OTTO_SORT_WORKERS
+HASH_WORKERS = int(os.environ.get("OTTO_HASH_WORKERS", "4"))
+
+# що робити з дублікатом: "skip" - залишити на місці, "hardlink" - замінити жорстким посиланням на оригінал
+DEDUP_MODES = ("skip", "hardlink")
+
+
+def partial_hash(path):
+    with open(path, "rb") as fh:
+        return hashlib.blake2b(fh.read(PARTIAL_SIZE), digest_size=20).hexdigest()
+
+
+def full_hash(path):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as fh:
+        if os.fstat(fh.fileno()).st_size >= MMAP_SIZE:
+            # великі файли хешуємо через mmap одним викликом, без копіювання шматків
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        else:
+            for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Deduplicator:
+    # шукає файли з однаковим вмістом у три етапи, кожен наступний лише серед
+    # збігів попереднього: розмір, хеш початку файлу, хеш усього файлу
+    def __init__(self, workers=HASH_WORKERS):
+        self.workers = max(1, workers)
+
+    def _regroup(self, groups, hash_function, executor):
+        paths = [path for group in groups for path in group]
+        hashes = dict(zip(paths, executor.map(hash_function, paths)))
+        regrouped = []
+        for group in groups:
+            by_hash = defaultdict(list)
+            for path in group:
+                by_hash[hashes[path]].append(path)
+            regrouped.extend(same for same in by_hash.values() if len(same) > 1)
+        return regrouped
+
+    def find(self, files, existing=()):
+        # files - нові файли, existing - вже відсортовані; повертає {дублікат: оригінал}.
+        # Оригіналом вважається вже відсортований файл, інакше перший з нових
+        incoming = set(files)
+        by_size = defaultdict(list)
+        for path in [*existing, *files]:
+            size = os.stat(path).st_size
+            if size:
+                by_size[size].append(path)
+        groups = [group for group in by_size.values()
+                  if len(group) > 1 and any(path in incoming for path in group)]
+        if not groups:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            groups = self._regroup(groups, partial_hash, executor)
+            large = [group for group in groups if os.stat(group[0]).st_size > PARTIAL_SIZE]
+            small = [group for group in groups if os.stat(group[0]).st_size <= PARTIAL_SIZE]
+            # для малих файлів хеш початку вже є хешем усього файлу
+            groups = small + self._regroup(large, full_hash, executor)
+        duplicates = {}
+        for group in groups:
+            original, *others = group
+            for path in others:
+                if path in incoming:
+                    duplicates[path] = original
+        return duplicates
@@ -1,194 +1,448 @@
-import sys
-import re
-import shutil
-from pathlib import Path
-
-
-class FileSorter:
-    JPEG_IMAGES = []
-    PNG_IMAGES = []
-    JPG_IMAGES = []
-    SVG_IMAGES = []
-    AVI_VIDEO = []
-    MP4_VIDEO = []
-    MOV_VIDEO = []
-    MKV_VIDEO = []
-    DOC_DOCUMENTS = []
-    DOCX_DOCUMENTS = []
-    TXT_DOCUMENTS = []
-    PDF_DOCUMENTS = []
-    XLSX_DOCUMENTS = []
-    PPTX_DOCUMENTS = []
-    MP3_AUDIO = []
-    OGG_AUDIO = []
-    WAV_AUDIO = []
-    AMR_AUDIO = []
-    ARCHIVES = []
-    ZIP_ARCHIVES = []
-    GZ_ARCHIVES = []
-    TAR_ARCHIVES = []
-    MY_OTHER = []
-
-    REGISTER_EXTENSION = {
-        'JPEG': JPEG_IMAGES,
-        'PNG': PNG_IMAGES,
-        'JPG': JPG_IMAGES,
-        'SVG': SVG_IMAGES,
-        'AVI': AVI_VIDEO,
-        'MP4': MP4_VIDEO,
-        'MOV': MOV_VIDEO,
-        'MKV': MKV_VIDEO,
-        'DOC': DOC_DOCUMENTS,
-        'DOCX': DOCX_DOCUMENTS,
-        'TXT': TXT_DOCUMENTS,
-        'PDF': PDF_DOCUMENTS,
-        'XLSX': XLSX_DOCUMENTS,
-        'PPTX': PPTX_DOCUMENTS,
-        'MP3': MP3_AUDIO,
-        'OGG': OGG_AUDIO,
-        'WAV': WAV_AUDIO,
-        'AMR': AMR_AUDIO,
-        'ZIP': ZIP_ARCHIVES,
-        'GZ': GZ_ARCHIVES,
-        'TAR': TAR_ARCHIVES,
-    }
-
-    FOLDERS = []
-    EXTENSIONS = set()
-    UNKNOWN = set()
-
-    CYRILLIC_SYMBOLS = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюяєіїґ'
-    TRANSLATION = ("a", "b", "v", "g", "d", "e", "e", "j", "z", "i", "j", "k", "l", "m", "n", "o", "p", "r", "s", "t", "u",
-                   "f", "h", "ts", "ch", "sh", "sch", "", "y", "", "e", "yu", "u", "ja", "je", "ji", "g")
-
-    TRANS = {}
-
-    for cyrillic, latin in zip(CYRILLIC_SYMBOLS, TRANSLATION):
-        TRANS[ord(cyrillic)] = latin
-        TRANS[ord(cyrillic.upper())] = latin.upper()
-
-    @staticmethod
-    def get_extension(name: str) -> str:
-        return Path(name).suffix[1:].upper()
-
-    @staticmethod
-    def normalize(name: str) -> str:
-        base_name, dot, extension = name.rpartition(".")
-        translate_name = re.sub(r'\W', '_', base_name.translate(FileSorter.TRANS))
-        return f"{translate_name}{dot}{extension}"
-
-    def handle_images(self, file_name: Path, target_folder: Path):
-        target_folder.mkdir(exist_ok=True, parents=True)
-        file_name.replace(target_folder / self.normalize(file_name.name))
-
-    def handle_video(self, file_name: Path, target_folder: Path):
-        target_folder.mkdir(exist_ok=True, parents=True)
-        file_name.replace(target_folder / self.normalize(file_name.name))
-
-    def handle_documents(self, file_name: Path, target_folder: Path):
-        target_folder.mkdir(exist_ok=True, parents=True)
-        file_name.replace(target_folder / self.normalize(file_name.name))
-
-    def handle_audio(self, file_name: Path, target_folder: Path):
-        target_folder.mkdir(exist_ok=True, parents=True)
-        file_name.replace(target_folder / self.normalize(file_name.name))
-
-    def handle_other(self, file_name: Path, target_folder: Path):
-        target_folder.mkdir(exist_ok=True, parents=True)
-        file_name.replace(target_folder / self.normalize(file_name.name))
-
-    def handle_archive(self, file_name: Path, target_folder: Path):
-        target_folder.mkdir(exist_ok=True, parents=True)
-        folder_for_file = target_folder / self.normalize(file_name.name.replace(file_name.suffix, ''))
-        folder_for_file.mkdir(exist_ok=True, parents=True)
-        try:
-            shutil.unpack_archive(str(file_name.absolute()), str(folder_for_file.absolute()))
-        except shutil.ReadError:
-            folder_for_file.rmdir()
-            return
-        file_name.unlink()
-
-    def scan(self, folder: Path):
-        for item in folder.iterdir():
-            if item.is_dir():
-                if item.name not in ('archives', 'video', 'audio', 'documents', 'images', 'MY_OTHER'):
-                    self.FOLDERS.append(item)
-                    self.scan(item)
-                continue
-
-            extension = self.get_extension(item.name)
-            full_name = folder / item.name
-            if not extension:
-                self.MY_OTHER.append(full_name)
-            else:
-                try:
-                    ext_reg = self.REGISTER_EXTENSION[extension]
-                    ext_reg.append(full_name)
-                    self.EXTENSIONS.add(extension)
-                except KeyError:
-                    self.UNKNOWN.add(extension)
-                    self.MY_OTHER.append(full_name)
-
-    def go(self, folder_path: str):
-        folder_process = Path(folder_path)
-        self.main(folder_process)
-
-    def main(self, folder: Path):
-        self.scan(folder)
-        for file in self.JPEG_IMAGES:
-            self.handle_images(file, folder / 'images' / 'JPEG')
-        for file in self.PNG_IMAGES:
-            self.handle_images(file, folder / 'images' / 'PNG')
-        for file in self.JPG_IMAGES:
-            self.handle_images(file, folder / 'images' / 'JPG')
-        for file in self.SVG_IMAGES:
-            self.handle_images(file, folder / 'images' / 'SVG')
-        for file in self.AVI_VIDEO:
-            self.handle_video(file, folder / 'video' / 'AVI')
-        for file in self.MP4_VIDEO:
-            self.handle_video(file, folder / 'video' / 'MP4')
-        for file in self.MOV_VIDEO:
-            self.handle_video(file, folder / 'video' / 'MOV')
-        for file in self.MKV_VIDEO:
-            self.handle_video(file, folder / 'video' / 'MKV')
-        for file in self.DOC_DOCUMENTS:
-            self.handle_documents(file, folder / 'documents' / 'DOC')
-        for file in self.DOCX_DOCUMENTS:
-            self.handle_documents(file, folder / 'documents' / 'DOCX')
-        for file in self.TXT_DOCUMENTS:
-            self.handle_documents(file, folder / 'documents' / 'TXT')
-        for file in self.PDF_DOCUMENTS:
-            self.handle_documents(file, folder / 'documents' / 'PDF')
-        for file in self.XLSX_DOCUMENTS:
-            self.handle_documents(file, folder / 'documents' / 'XLSX')
-        for file in self.PPTX_DOCUMENTS:
-            self.handle_documents(file, folder / 'documents' / 'PPTX')
-        for file in self.MP3_AUDIO:
-            self.handle_audio(file, folder / 'audio' / 'MP3')
-        for file in self.OGG_AUDIO:
-            self.handle_audio(file, folder / 'audio' / 'OGG')
-        for file in self.WAV_AUDIO:
-            self.handle_audio(file, folder / 'audio' / 'WAV')
-        for file in self.AMR_AUDIO:
-            self.handle_audio(file, folder / 'audio' / 'AMR')
-        for file in self.ZIP_ARCHIVES:
-            self.handle_archive(file, folder / 'archives' / 'ZIP')
-        for file in self.GZ_ARCHIVES:
-            self.handle_archive(file, folder / 'archives' / 'GZ')
-        for file in self.TAR_ARCHIVES:
-            self.handle_archive(file, folder / 'archives' / 'TAR')
-        for file in self.MY_OTHER:
-            self.handle_other(file, folder / 'MY_OTHER')
-
-
-def exit_bot() -> None:
-    print("Good bye!")
-    sys.exit()
-
-
-if __name__ == "__main__":
-    print("Hello my name is Otto. How can I help you?")
-    folder_path = input("Enter the path to the folder: ")
-    sorter = FileSorter()
-    sorter.go(folder_path)
-    exit_bot()
+import json
+import os
+import sys
+import queue
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from bot_assistant.archive_extractor import MAX_DEPTH, MAX_MEMBERS, MAX_TOTAL_SIZE, ArchiveExtractor
+from bot_assistant.dedup import DEDUP_MODES, Deduplicator
+from bot_assistant.instrumentation import STATS
+from bot_assistant.manifest import SERVICE_FOLDER, Manifest
+from bot_assistant.normalizer import CYRILLIC, Normalizer
+from bot_assistant.sort_plan import MovePlan
+from bot_assistant.storage import write_atomic
+
+
+# розширення -> папка призначення відносно папки, що сортується
+CATEGORIES = {
+    'JPEG': ('images', 'JPEG'),
+    'PNG': ('images', 'PNG'),
+    'JPG': ('images', 'JPG'),
+    'SVG': ('images', 'SVG'),
+    'AVI': ('video', 'AVI'),
+    'MP4': ('video', 'MP4'),
+    'MOV': ('video', 'MOV'),
+    'MKV': ('video', 'MKV'),
+    'DOC': ('documents', 'DOC'),
+    'DOCX': ('documents', 'DOCX'),
+    'TXT': ('documents', 'TXT'),
+    'PDF': ('documents', 'PDF'),
+    'XLSX': ('documents', 'XLSX'),
+    'PPTX': ('documents', 'PPTX'),
+    'MP3': ('audio', 'MP3'),
+    'OGG': ('audio', 'OGG'),
+    'WAV': ('audio', 'WAV'),
+    'AMR': ('audio', 'AMR'),
+    'ZIP': ('archives', 'ZIP'),
+    'GZ': ('archives', 'GZ'),
+    'TAR': ('archives', 'TAR'),
+}
+OTHER = ('MY_OTHER',)
+ARCHIVES = 'archives'
+
+# папки, створені сортувальником, повторно не скануються
+SORTED_FOLDERS = ('archives', 'video', 'audio', 'documents', 'images', 'MY_OTHER', SERVICE_FOLDER)
+DUPLICATES_REPORT = 'duplicates.json'
+# скільки кроків плану виконується між збереженнями прогресу
+BATCH_SIZE = 500
+
+
+def extract_archive(file_name: Path, folder_for_file: Path, extractor: ArchiveExtractor = None):
+    # на рівні модуля, щоб функцію можна було передати в інший процес.
+    # Counter категорій розсортованих членів архіву або None, якщо розпакувати не вдалось
+    return (extractor or ArchiveExtractor()).extract(file_name, folder_for_file)
+
+
+def member_target(folder: Path, normalizer: Normalizer, name: str):
+    # куди покласти член архіву, якщо архіви сортуються по категоріях
+    category = CATEGORIES.get(FileSorter.get_extension(name), OTHER)
+    return category, folder.joinpath(*category, normalizer(name))
+
+
+class SortResult:
+    # результат одного сортування: кожен запуск має власний, тож запуски не
+    # змішуються між собою і можуть іти одночасно
+    def __init__(self, folder: Path):
+        self.folder = folder
+        self.files = defaultdict(list)  # папка призначення -> файли
+        self.folders = []
+        self.extensions = set()
+        self.unknown = set()
+        self.counts = Counter()         # папка призначення -> скільки файлів
+        self.extracted = 0
+        self.not_extracted = 0
+        self.unchanged = 0              # файли, пропущені інкрементальним режимом
+        self.duplicates = []            # знайдені дублікати: звіт про кожен
+        self.plan = None                # план, якщо сортування запускалось з dry_run
+
+    def classify(self, extension: str) -> tuple:
+        category = CATEGORIES.get(extension)
+        if category is None:
+            if extension:
+                self.unknown.add(extension)
+            return OTHER
+        self.extensions.add(extension)
+        return category
+
+    def add(self, file_name, extension: str) -> tuple:
+        category = self.classify(extension)
+        self.files[category].append(file_name)
+        return category
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def __str__(self):
+        if self.plan is not None:
+            lines = [f"Dry run, nothing moved. Would sort {self.total} files in {self.folder}"]
+        else:
+            lines = [f"Sorted {self.total} files in {self.folder}"]
+        for category, count in sorted(self.counts.items()):
+            lines.append(f"  {'/'.join(category)}: {count}")
+        if self.extracted or self.not_extracted:
+            lines.append(f"Archives unpacked: {self.extracted}, failed: {self.not_extracted}")
+        if self.duplicates:
+            lines.append(f"Duplicates found: {len(self.duplicates)} (see {SERVICE_FOLDER}/{DUPLICATES_REPORT})")
+        if self.unchanged:
+            lines.append(f"Unchanged files skipped: {self.unchanged}")
+        if self.unknown:
+            lines.append(f"Unknown extensions: {', '.join(sorted(self.unknown))}")
+        if self.plan is not None:
+            lines.append(str(self.plan))
+        return "\n".join(lines)
+
+
+class FileSorter:
+    # max_archive_* - ліміти розпакування одного архіву, разом з вкладеними;
+    # alphabet - таблиця транслітерації імен файлів (за замовчуванням кирилиця)
+    def __init__(self, max_archive_size: int = MAX_TOTAL_SIZE, max_archive_members: int = MAX_MEMBERS,
+                 max_archive_depth: int = MAX_DEPTH, alphabet: dict = CYRILLIC):
+        self.normalizer = Normalizer(alphabet)
+        self.max_archive_size = max_archive_size
+        self.max_archive_members = max_archive_members
+        self.max_archive_depth = max_archive_depth
+
+    @staticmethod
+    def get_extension(name: str) -> str:
+        # те саме, що Path(name).suffix, але без створення Path
+        dot = name.rfind('.')
+        if dot <= 0 or dot == len(name) - 1:
+            return ''
+        return name[dot + 1:].upper()
+
+    def normalize(self, name: str) -> str:
+        return self.normalizer(name)
+
+    def handle_file(self, file_name: Path, target_folder: Path):
+        target_folder.mkdir(exist_ok=True, parents=True)
+        file_name.replace(target_folder / self.normalize(file_name.name))
+
+    handle_images = handle_video = handle_documents = handle_audio = handle_other = handle_file
+
+    def handle_archive(self, file_name: Path, target_folder: Path) -> bool:
+        target_folder.mkdir(exist_ok=True, parents=True)
+        folder_for_file = target_folder / self.normalize(file_name.name.replace(file_name.suffix, ''))
+        return extract_archive(file_name, folder_for_file, self.extractor()) is not None
+
+    def extractor(self, folder: Path = None) -> ArchiveExtractor:
+        # з folder члени архівів сортуються по категоріях цієї папки
+        place = partial(member_target, folder, self.normalizer) if folder is not None else None
+        return ArchiveExtractor(self.max_archive_size, self.max_archive_members, self.max_archive_depth, place)
+
+    def walk(self, folder: Path, folders=None, manifest: Manifest = None):
+        # обхід без рекурсії через os.scandir: тип запису береться з DirEntry без
+        # зайвого stat, а файли віддаються одразу, не чекаючи кінця сканування.
+        # З manifest незмінені папки не читаються, а незмінені файли пропускаються
+        stack = [os.fspath(folder)]
+        while stack:
+            current = stack.pop()
+            if manifest is not None:
+                subfolders = manifest.unchanged_folder(current)
+                if subfolders is not None:
+                    stack.extend(subfolders)
+                    continue
+                manifest.begin_folder(current)
+            subfolders = []
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        if entry.name not in SORTED_FOLDERS:
+                            if folders is not None:
+                                folders.append(Path(entry.path))
+                            subfolders.append(entry.path)
+                        continue
+                    if manifest is not None and manifest.unchanged_file(entry):
+                        continue
+                    yield entry, self.get_extension(entry.name)
+            if manifest is not None:
+                manifest.end_folder(current, subfolders)
+            stack.extend(subfolders)
+
+    def scan(self, folder: Path, result: SortResult = None, manifest: Manifest = None) -> SortResult:
+        result = result or SortResult(folder)
+        for entry, extension in self.walk(folder, result.folders, manifest):
+            category = result.add(Path(entry.path), extension)
+            if manifest is not None:
+                manifest.assign(entry.path, self.target_path(folder, category, entry.name))
+        return result
+
+    def target_path(self, folder: Path, category: tuple, name: str) -> Path:
+        if category[0] == ARCHIVES:
+            file_name = Path(name)
+            return folder.joinpath(*category, self.normalize(file_name.name.replace(file_name.suffix, '')))
+        return folder.joinpath(*category, self.normalize(name))
+
+    # workers > 1 - файли переміщуються паралельно, поки триває сканування;
+    # incremental - пропускаються папки і файли, що не змінились з минулого сортування;
+    # dedup - "skip" або "hardlink", що робити з файлами, вміст яких уже є серед відсортованих;
+    # dry_run - лише скласти і зберегти план, нічого не переміщуючи (виконати його можна через resume);
+    # sort_archives - вміст архівів сортується по категоріях, а не розпаковується в окрему папку
+    def go(self, folder_path: str, workers: int = 1, incremental: bool = False, dedup: str = None,
+           dry_run: bool = False, sort_archives: bool = False, progress=None) -> SortResult:
+        if dedup is not None and dedup not in DEDUP_MODES:
+            raise ValueError(f"Unknown dedup mode '{dedup}'")
+        folder_process = Path(folder_path)
+        manifest = Manifest(folder_process) if incremental else None
+        if workers > 1 and dedup is None and not dry_run:
+            with STATS.stage("sort.concurrent"):
+                result = self.main_concurrent(folder_process, workers, manifest, sort_archives)
+        else:
+            # дублікати можна шукати лише після повного сканування, тож тут файли
+            # переміщуються за планом, а паралельно рахуються хеші
+            result, plan = self.plan(folder_process, manifest, dedup, sort_archives)
+            if dry_run:
+                plan.save()
+                result.plan = plan
+                return result
+            with STATS.stage("sort.execute"):
+                self.execute(plan, result, progress=progress)
+        if manifest is not None:
+            result.unchanged = manifest.unchanged_files
+            with STATS.stage("sort.manifest"):
+                manifest.save()
+        return result
+
+    def main(self, folder: Path, manifest: Manifest = None, dedup: str = None) -> SortResult:
+        result, plan = self.plan(folder, manifest, dedup)
+        self.execute(plan, result)
+        return result
+
+    # продовжує перерване сортування (або виконує план після dry_run) без повторного сканування
+    def resume(self, folder_path: str, progress=None) -> SortResult:
+        folder = Path(folder_path)
+        plan = MovePlan.load(folder)
+        if plan is None:
+            return None
+        result = SortResult(folder)
+        for _, _, target, _ in plan.steps[plan.done:]:
+            result.counts[target.parent.relative_to(folder).parts] += 1
+        with STATS.stage("sort.execute"):
+            self.execute(plan, result, progress=progress)
+        return result
+
+    def plan(self, folder: Path, manifest: Manifest = None, dedup: str = None, sort_archives: bool = False):
+        with STATS.stage("sort.scan"):
+            result = self.scan(folder, manifest=manifest)
+        duplicates = {}
+        if dedup:
+            with STATS.stage("sort.dedup"):
+                duplicates = self.find_duplicates(folder, result)
+        plan = MovePlan(folder)
+        targets = {}
+        duplicate_categories = {}
+        for category, files in result.files.items():
+            action = "move"
+            if category[0] == ARCHIVES:
+                action = "unpack" if sort_archives else "extract"
+            for file in files:
+                if file in duplicates:
+                    duplicate_categories[file] = category
+                    continue
+                target = plan.unique_target(self.target_path(folder, category, file.name))
+                targets[file] = target
+                plan.add(action, file, target)
+                result.counts[category] += 1
+                if manifest is not None:
+                    manifest.assign(file, target)
+        for duplicate, original in duplicates.items():
+            original_location = targets.get(original, original)
+            if dedup == "skip":
+                # оригінал ще не переміщено, тож розмір береться з його поточного місця
+                result.duplicates.append(self.duplicate_report(duplicate, original_location, "skip",
+                                                               original.stat().st_size))
+                continue
+            category = duplicate_categories[duplicate]
+            target = self.target_path(folder, category, duplicate.name)
+            if target != original_location:
+                target = plan.unique_target(target)
+            plan.add("link", duplicate, target, original_location)
+            result.counts[category] += 1
+        plan.order()
+        return result, plan
+
+    def execute(self, plan: MovePlan, result: SortResult, batch_size: int = BATCH_SIZE, progress=None):
+        # план зберігається до першого переміщення, а прогрес - після кожної порції,
+        # тож перерване сортування можна продовжити через resume
+        plan.save()
+        for start, batch in plan.batches(batch_size):
+            batch[0][2].parent.mkdir(exist_ok=True, parents=True)
+            for action, source, target, original in batch:
+                try:
+                    self.apply_step(action, source, target, original, result)
+                except FileNotFoundError:
+                    # крок уже виконаний до перерваного запуску
+                    if source.exists():
+                        raise
+            plan.done = start + len(batch)
+            plan.save_progress()
+            if progress is not None:
+                progress(plan.done, len(plan))
+        plan.remove()
+        if result.duplicates:
+            report = plan.folder / SERVICE_FOLDER / DUPLICATES_REPORT
+            write_atomic(report, json.dumps(result.duplicates, indent=4, ensure_ascii=False))
+
+    def apply_step(self, action: str, source: Path, target: Path, original: Path, result: SortResult):
+        if action == "move":
+            os.replace(source, target)
+        elif action in ("extract", "unpack"):
+            with STATS.stage("sort.extract"):
+                counts = extract_archive(source, target, self.extractor(result.folder if action == "unpack" else None))
+            self.count_extraction(result, counts)
+        else:
+            action = "hardlink"
+            try:
+                if target != original:
+                    os.link(original, target)
+                source.unlink()
+            except FileNotFoundError:
+                raise
+            except OSError:
+                # файлова система не підтримує жорстких посилань - дублікат лишається на місці
+                action = "skip"
+            result.duplicates.append(self.duplicate_report(source, original, action))
+
+    @staticmethod
+    def count_extraction(result: SortResult, counts):
+        if counts is None:
+            result.not_extracted += 1
+        else:
+            result.extracted += 1
+            result.counts.update(counts)
+
+    @staticmethod
+    def duplicate_report(duplicate: Path, original: Path, action: str, size: int = None) -> dict:
+        if size is None:
+            size = original.stat().st_size
+        return {"file": str(duplicate), "original": str(original), "size": size, "action": action}
+
+    def existing_files(self, folder: Path, categories) -> list:
+        files = []
+        for category in categories:
+            if category[0] == ARCHIVES:
+                continue
+            try:
+                with os.scandir(folder.joinpath(*category)) as entries:
+                    files.extend(Path(entry.path) for entry in entries if entry.is_file())
+            except FileNotFoundError:
+                pass
+        return files
+
+    def find_duplicates(self, folder: Path, result: SortResult) -> dict:
+        incoming = [file for category, files in result.files.items() if category[0] != ARCHIVES for file in files]
+        return Deduplicator().find(incoming, self.existing_files(folder, result.files))
+
+    def main_concurrent(self, folder: Path, workers: int, manifest: Manifest = None,
+                        sort_archives: bool = False) -> SortResult:
+        # сканування кладе файли в чергу, потоки їх переміщують,
+        # архіви розпаковуються в окремих процесах
+        result = SortResult(folder)
+        files = queue.Queue(maxsize=workers * 64)
+        created = set()
+        created_lock = threading.Lock()
+        errors = []
+        # імена призначення займає лише потік сканування, як і в плані: файли, що після normalize
+        # отримали одне ім'я, не перезаписують один одного
+        targets = MovePlan(folder)
+
+        def ensure_folder(target_folder):
+            # кожна папка призначення створюється один раз за сортування
+            if target_folder in created:
+                return
+            with created_lock:
+                if target_folder not in created:
+                    target_folder.mkdir(exist_ok=True, parents=True)
+                    created.add(target_folder)
+
+        def mover():
+            while True:
+                item = files.get()
+                if item is None:
+                    return
+                entry, target = item
+                try:
+                    ensure_folder(target.parent)
+                    os.replace(entry.path, target)
+                except OSError as error:
+                    errors.append(error)
+
+        archives = []
+        threads = [threading.Thread(target=mover) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as extractor:
+                extractions = []
+                archive_extractor = self.extractor()
+                for entry, extension in self.walk(folder, result.folders, manifest):
+                    category = result.classify(extension)
+                    target_folder = folder.joinpath(*category)
+                    result.counts[category] += 1
+                    target = self.target_path(folder, category, entry.name)
+                    if category[0] != ARCHIVES:
+                        target = targets.unique_target(target)
+                    if manifest is not None:
+                        manifest.assign(entry.path, target)
+                    if category[0] == ARCHIVES:
+                        ensure_folder(target_folder)
+                        file_name = Path(entry.path)
+                        folder_for_file = target_folder / self.normalize(file_name.name.replace(file_name.suffix, ''))
+                        if sort_archives:
+                            archives.append((file_name, folder_for_file))
+                        else:
+                            extractions.append(extractor.submit(extract_archive, file_name, folder_for_file, archive_extractor))
+                    else:
+                        files.put((entry, target))
+                for extraction in extractions:
+                    self.count_extraction(result, extraction.result())
+        finally:
+            for _ in threads:
+                files.put(None)
+            for thread in threads:
+                thread.join()
+        if archives and not errors:
+            # члени архівів лягають у ті самі папки, що й файли, тож такі архіви розпаковуються після переміщень
+            with ProcessPoolExecutor(max_workers=workers) as extractor:
+                unpack = partial(extract_archive, extractor=self.extractor(folder))
+                for counts in extractor.map(unpack, *zip(*archives)):
+                    self.count_extraction(result, counts)
+        if errors:
+            raise errors[0]
+        return result
+
+
+def exit_bot() -> None:
+    print("Good bye!")
+    sys.exit()
+
+
+if __name__ == "__main__":
+    print("Hello my name is Otto. How can I help you?")
+    folder_path = input("Enter the path to the folder: ")
+    sorter = FileSorter()
+    print(sorter.go(folder_path))
+    exit_bot()
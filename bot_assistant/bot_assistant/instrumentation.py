@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+# OTTO_STATS=1 (або otto --stats) вмикає збір статистики; вимкнена статистика коштує одну перевірку
+ENABLED = os.environ.get("OTTO_STATS", "") not in ("", "0")
+# куди команда profile записує профілі
+PROFILE_DIR = os.environ.get("OTTO_PROFILE_DIR", "otto_profiles")
+# скільки рядків профілю показати у відповіді, повний профіль - у файлі
+PROFILE_TOP = 15
+
+
+class Histogram:
+    # час у кошиках за степенями двійки мікросекунд: кошик i - менше за 2**i мкс
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = defaultdict(int)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[int(seconds * 1_000_000).bit_length()] += 1
+
+    def percentile(self, share):
+        # верхня межа кошика, в який потрапляє частка share викликів, у секундах
+        needed = share * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= needed:
+                return min(2 ** bucket / 1_000_000, self.max)
+        return self.max
+
+    def __str__(self):
+        mean = self.total / self.count if self.count else 0
+        return (f"{self.count:>7} {mean * 1000:>9.3f} {self.percentile(0.5) * 1000:>9.3f} "
+                f"{self.percentile(0.95) * 1000:>9.3f} {self.percentile(0.99) * 1000:>9.3f} {self.max * 1000:>9.3f}")
+
+
+class Stats:
+    # статистика живого сеансу: час команд, скільки записів переглянув кожен пошук,
+    # обсяг і час читання/запису книг, час етапів сортування файлів
+    HEADER = f"{'':<28} {'count':>7} {'mean, ms':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}"
+
+    def __init__(self, enabled=ENABLED):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.commands = defaultdict(Histogram)
+            self.stages = defaultdict(Histogram)
+            self.scans = defaultdict(lambda: [0, 0])      # пошук -> [викликів, переглянуто записів]
+            self.io = defaultdict(lambda: [0, 0, 0.0])    # операція -> [викликів, байтів, секунд]
+
+    def command(self, name, seconds):
+        with self.lock:
+            self.commands[name].add(seconds)
+
+    def scanned(self, search, count):
+        with self.lock:
+            scan = self.scans[search]
+            scan[0] += 1
+            scan[1] += count
+
+    def add_io(self, operation, size, seconds):
+        with self.lock:
+            io = self.io[operation]
+            io[0] += 1
+            io[1] += size
+            io[2] += seconds
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.stages[name].add(elapsed)
+
+    def report(self):
+        if not self.enabled:
+            return "Statistics are off. Start otto with --stats or OTTO_STATS=1."
+        with self.lock:
+            lines = ["Command latency", self.HEADER]
+            lines.extend(f"{name:<28} {histogram}" for name, histogram in sorted(self.commands.items()))
+            if self.stages:
+                lines += ["", "File sorting stages", self.HEADER]
+                lines.extend(f"{name:<28} {histogram}" for name, histogram in sorted(self.stages.items()))
+            if self.scans:
+                lines += ["", f"{'Records scanned by searches':<28} {'calls':>7} {'scanned':>10} {'per call':>9}"]
+                for name, (calls, scanned) in sorted(self.scans.items()):
+                    lines.append(f"{name:<28} {calls:>7} {scanned:>10} {scanned / calls:>9.1f}")
+            if self.io:
+                lines += ["", f"{'Persistence':<28} {'calls':>7} {'KiB':>10} {'total, ms':>10}"]
+                for name, (calls, size, seconds) in sorted(self.io.items()):
+                    lines.append(f"{name:<28} {calls:>7} {size / 1024:>10.1f} {seconds * 1000:>10.1f}")
+        return "\n".join(lines)
+
+
+# один об'єкт на процес: його оновлюють бот, книги і сортувальник
+STATS = Stats()
+
+
+def files_size(files):
+    return sum(os.path.getsize(name) for name in files if os.path.exists(name))
+
+
+def measured_io(operation):
+    # декоратор для save_to_json/load_from_json книг: час і розмір файлів сховища
+    # (для запису - після нього, для читання - до нього)
+    def decorate(method):
+        @wraps(method)
+        def wrapper(book, *args, **kwargs):
+            if not STATS.enabled:
+                return method(book, *args, **kwargs)
+            size = files_size(book.storage.files()) if operation == "load" else 0
+            started = time.perf_counter()
+            try:
+                return method(book, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                if operation != "load":
+                    size = files_size(book.storage.files())
+                STATS.add_io(f"{type(book).__name__}.{operation}", size, elapsed)
+        return wrapper
+    return decorate
+
+
+def profile_call(action, name, memory=False, folder=PROFILE_DIR):
+    # виконує action() під cProfile (memory=True - під tracemalloc) і записує профіль у folder.
+    # Повертає (результат, шлях до профілю, короткий підсумок)
+    os.makedirs(folder, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    if memory:
+        import tracemalloc
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        try:
+            result = action()
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+        path = os.path.join(folder, f"{name}-{stamp}.tracemalloc")
+        snapshot.dump(path)
+        summary = "\n".join(str(stat) for stat in snapshot.statistics("lineno")[:PROFILE_TOP])
+        return result, path, summary
+    import cProfile
+    import io
+    import pstats
+    profiler = cProfile.Profile()
+    result = profiler.runcall(action)
+    path = os.path.join(folder, f"{name}-{stamp}.prof")
+    profiler.dump_stats(path)
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(PROFILE_TOP)
+    return result, path, stream.getvalue().strip()
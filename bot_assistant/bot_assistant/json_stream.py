@@ -0,0 +1,78 @@
+import json
+from itertools import islice
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+
+
+def iter_json_array(fh, chunk_size=CHUNK_SIZE):
+    # читає json-масив з файлу частинами і віддає елементи по одному,
+    # тож у пам'яті одночасно лише поточний елемент і один прочитаний шматок
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = fh.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def next_char():
+        # пропускає пробіли і повертає наступний символ ("" в кінці файлу)
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return buffer[pos:pos + 1]
+            fill()
+
+    char = next_char()
+    if not char:
+        return
+    if char != "[":
+        raise ValueError("Expected a JSON array")
+    pos += 1
+    if next_char() == "]":
+        return
+    while True:
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            if not eof and (end == len(buffer) or buffer[end] not in WHITESPACE + ",]"):
+                # число на межі шматка могло бути прочитане не повністю
+                fill()
+                continue
+            break
+        pos = end
+        yield item
+        char = next_char()
+        if char == "]":
+            return
+        if char != ",":
+            raise ValueError("Expected ',' or ']' in JSON array")
+        pos += 1
+        next_char()
+
+
+def iter_json_file(filename, chunk_size=CHUNK_SIZE):
+    with open(filename, "r", encoding="utf-8") as fh:
+        yield from iter_json_array(fh, chunk_size)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -1,11 +1,13 @@
+import argparse
+import os
 import sys
+import threading
 import time
-from bot_assistant.contacts import AddressBook, Record, Name, Phone, Birthday, Email
+from collections import Counter, defaultdict
+from bot_assistant.contacts import AddressBook, Record, Phone, Birthday, Email
 from bot_assistant.notebook import Note, NoteBook
-from bot_assistant.file_sorter import FileSorter
-from datetime import datetime
-from prompt_toolkit.completion import WordCompleter
-from prompt_toolkit import PromptSession
+from bot_assistant.commands import CommandRegistry, no_args, stripped_args
+from bot_assistant.instrumentation import STATS
 
 
 OTTO = r"""
@@ -16,47 +18,131 @@ I am your personal bot-assistant named
  \__/ (__)  (__) \__/
  """
 
-# Список команд для автодоповнення
-COMMANDS = [
-    "help",
-    "exit",
-    "add_contact",
-    "change_contact_phone",
-    "change_contact_name",
-    "show_all_contacts",
-    "search_by_bd",
-    "add_birthday",
-    "add_email",
-    "add_phone",
-    "add_note",
-    "search_note",
-    "edit_note",
-    "remove_note",
-    "show_note",
-    "help_note",
-    "delete_contact",
-    "search_contacts",
-    "sort_files"
-]
-
-command_completer = WordCompleter(COMMANDS)
-
-# Створення сессії з автодоповненнями
-session = PromptSession(completer=command_completer)
+# спосіб зберігання: "json", "journal", "sqlite", "binary" або "mapped" (див. storage.py);
+# журнал ведеться лише для адресної книги, нотатки тоді зберігаються в json
+STORAGE = os.environ.get("OTTO_STORAGE", "json")
+NOTE_STORAGE = "sqlite" if STORAGE == "sqlite" else "json"
 
+# скільки потоків переміщують файли при сортуванні (1 - послідовно)
+SORT_WORKERS = int(os.environ.get("OTTO_SORT_WORKERS", "1"))
+# ліміти розпакування одного архіву при сортуванні: обсяг у МБ і кількість файлів
+ARCHIVE_MAX_MB = int(os.environ.get("OTTO_ARCHIVE_MAX_MB", "1024"))
+ARCHIVE_MAX_FILES = int(os.environ.get("OTTO_ARCHIVE_MAX_FILES", "10000"))
+
+# через скільки секунд після зміни контакти й нотатки зберігаються у фоні (0 - лише при виході)
+AUTOSAVE = float(os.environ.get("OTTO_AUTOSAVE", "2"))
+
+# за скільки днів наперед шукати дні народження
+BIRTHDAY_WINDOW = 14
+
+# усі команди бота; методи ContactBot реєструються декоратором registry.command
+registry = CommandRegistry()
+
+
+# розбір аргументів окремих команд
+def parse_days(rest):
+    days = rest.strip()
+    if not days:
+        return ()
+    # isdecimal, а не isdigit: "²" - цифра, але int її не розбере
+    if not days.isdecimal():
+        raise ValueError()
+    try:
+        return (int(days),)
+    except ValueError:  # занадто довге число
+        raise ValueError()
+
+
+def parse_edit_note(rest):
+    args = rest.split()
+    if len(args) < 2:
+        raise ValueError("Please, provide both an ID and new content for the note.")
+    # перше слово - назва нотатки, все інше - новий зміст
+    return args[0], " ".join(args[1:])
+
+
+def parse_stats(rest):
+    action = rest.strip().lower()
+    if action not in ("", "reset"):
+        raise ValueError()
+    return (action,)
 
-class ContactBot:
-    def __init__(self, address_book, note_book):
-        self.address_book = address_book
-        self.note_book = note_book
-        self.sorter = FileSorter() # об'єкт сортувальник
 
-    @staticmethod
-    def hello():
+def parse_profile(rest):
+    line = rest.strip()
+    option, _, others = line.partition(" ")
+    memory = option == "--memory"
+    if memory:
+        line = others.strip()
+    if not line:
+        raise ValueError()
+    return memory, line
+
+
+def parse_sort_files(rest):
+    if not rest.strip():
+        raise ValueError("Please provide the path to the folder you want to sort.")
+    options, folder_path = split_sort_options(rest)
+    if options is None:
+        raise ValueError()
+    return options, folder_path
+
+
+class ContactBot:
+    # address_book і note_book - готові книги або функції, що відкривають їх при першому зверненні;
+    # autosave - через скільки секунд після зміни зберігати книги у фоні (None - лише при виході,
+    # як у пакетному режимі, де книги зберігаються один раз у кінці)
+    def __init__(self, address_book, note_book, autosave=None):
+        self._address_book = address_book
+        self._note_book = note_book
+        self._sorter = None
+        self.input = input  # звідки add_note читає назву, текст і теги
+        self.session = None
+        # команди, фоновий пошук днів народження і автозбереження не працюють з книгами одночасно
+        self.lock = threading.RLock()
+        self.autosaver = None
+        if autosave:
+            from bot_assistant.autosave import AutoSaver
+            self.autosaver = AutoSaver(self.lock, autosave)
+            for book in self.opened_books():
+                self.autosaver.watch(book)
+
+    @property
+    def address_book(self):
+        with self.lock:
+            if callable(self._address_book):
+                self._address_book = self._address_book()
+                if self.autosaver is not None:
+                    self.autosaver.watch(self._address_book)
+            return self._address_book
+
+    @property
+    def note_book(self):
+        with self.lock:
+            if callable(self._note_book):
+                self._note_book = self._note_book()
+                if self.autosaver is not None:
+                    self.autosaver.watch(self._note_book)
+            return self._note_book
+
+    @property
+    def sorter(self):
+        # об'єкт сортувальник; стану між запусками не зберігає. Модуль сортування
+        # з пулами процесів і архіваторами імпортується лише для sort_files
+        if self._sorter is None:
+            from bot_assistant.file_sorter import FileSorter
+            self._sorter = FileSorter(max_archive_size=ARCHIVE_MAX_MB * 1024 * 1024, max_archive_members=ARCHIVE_MAX_FILES)
+        return self._sorter
+
+    @registry.command("hello", description="Displays a greeting message and offers assistance.", parse=no_args)
+    def hello(self):
         return "How can I help you?"
 
     # додавання контакту
+    @registry.command("add_contact", "<name> <phone>", "Adds a new contact.", group="contacts")
     def add_contact(self, data):
+        if self.phone_exists(data):
+            return "The phone number you entered already exists"  # Введений вами номер телефону вже існує
         try:
             name, phone = data.rsplit(maxsplit=1)
             record = Record(name)
@@ -67,6 +153,7 @@ class ContactBot:
             return "Invalid data format. Please provide both name and phone."
 
     # зміна номера телефону контакту
+    @registry.command("change_contact_phone", "<name> <new phone>", "Updates the phone number of a contact.", group="contacts")
     def change_contact_phone(self, data):
         try:
             name, phone = data.rsplit(maxsplit=1)
@@ -81,27 +168,30 @@ class ContactBot:
             return "Invalid data format. Please provide both name and phone."
         
     # зміна імені контакту
+    @registry.command("change_contact_name", "<old name>, <new name>", "Updates the name of a contact", group="contacts")
     def change_contact_name(self, data):
         try:
             old_name, new_name = data.split(", ")
             if old_name in self.address_book:
-                record = self.address_book.find(old_name)
-                record.name = Name(new_name)
-                self.address_book.data[new_name] = self.address_book.data.pop(old_name)
+                if new_name != old_name and new_name in self.address_book:
+                    return f"Contact '{new_name}' already exists"
+                self.address_book.rename(old_name, new_name)
                 return f"Name updated successfully for {old_name} to {new_name}"
             else:
                 return "Contact not found"
         except ValueError:
             return "Invalid data format. Please provide both old name and new name."
 
+    @registry.command("add_phone", "<name> <phone>", "Adds an additional phone number to an existing contact.", group="contacts")
     def add_phone(self, data):
+        if self.phone_exists(data):
+            return "The phone number you entered already exists"  # Введений вами номер телефону вже існує
         try:
             name, phone = data.rsplit(maxsplit=1)
             if name and phone:  # Ensure both name and phone are provided
                 record = self.address_book.find(name)
                 if record:
-                    record.add_phone(Phone(phone))
-                    self.address_book.save_to_json()  # Save changes to JSON file
+                    record.add_phone(Phone(phone))  # на диск зміна потрапить з автозбереженням
                     return f"Phone number {phone} added for {name}"
                 else:
                     return f"Contact '{name}' not found"
@@ -111,6 +201,7 @@ class ContactBot:
             return f"Error: {e}"
 
     # вивід всіх контактів
+    @registry.command("show_all_contacts", description="Displays all contacts.", parse=no_args, group="contacts")
     def show_all_contacts(self):
         if not self.address_book.data:
             return "No contacts available"
@@ -125,31 +216,16 @@ class ContactBot:
                 result += contact_info + "\n"
             return result
 
-    # пошук контактів з днем народження в межах 14 днів
-    def search_by_bd(self):
-        upcoming_birthday_contacts = []
-        today = datetime.today()
-        for contact in self.address_book.data.values():
-            if contact.birthday.value_as_datetime():
-                next_birthday = datetime(
-                    today.year,
-                    contact.birthday.value_as_datetime().month,
-                    contact.birthday.value_as_datetime().day,
-                )
-                if next_birthday.date() == today.date():
-                    print("*"*35)
-                    print(f"Today is BD of {contact.name.value}!!! {contact.birthday.value}")
-                    print("*"*35)
-
-                elif next_birthday.date() < today.date():
-                    next_birthday = datetime(
-                        today.year + 1,
-                        contact.birthday.value_as_datetime().month,
-                        contact.birthday.value_as_datetime().day,
-                    )
-                days_to_birthday = (next_birthday.date() - today.date()).days
-                if 0 <= days_to_birthday <= 14:
-                    upcoming_birthday_contacts.append((contact, days_to_birthday))
+    # пошук контактів з днем народження в межах days днів
+    @registry.command("search_by_bd", "[days]", f"Searches for contacts whose birthday is within the next days (default {BIRTHDAY_WINDOW}).",
+                      parse=parse_days, group="contacts")
+    def search_by_bd(self, days=BIRTHDAY_WINDOW):
+        upcoming_birthday_contacts = self.address_book.upcoming_birthdays(days)
+        for contact, days_left in upcoming_birthday_contacts:
+            if days_left == 0:
+                print("*"*35)
+                print(f"Today is BD of {contact.name.value}!!! {contact.birthday.value}")
+                print("*"*35)
         if not upcoming_birthday_contacts:
             return "No contacts with upcoming birthdays."
         else:
@@ -159,6 +235,7 @@ class ContactBot:
             return result
 
     # додавання дня народження контакту
+    @registry.command("add_birthday", "<name> <birthday>", "Adds a birthday to a contact.", group="contacts")
     def add_birthday(self, data):
         try:
             name, birthday = data.rsplit(maxsplit=1)
@@ -171,6 +248,7 @@ class ContactBot:
             return "Invalid data format. Please provide both name and birthday."
 
     # додавання електронної адреси контакту
+    @registry.command("add_email", "<name> <email>", "Adds an email to a contact.", group="contacts")
     def add_email(self, data):
         try:
             name, email = data.rsplit(maxsplit=1)
@@ -185,86 +263,60 @@ class ContactBot:
         except ValueError:
             return "Invalid data format. Please provide both name and email."
 
+    @registry.command("add_note", description="Adds a new note.", parse=no_args, group="notes")
     def add_note(self):
-        title = input("Enter the title of the note:  ")
-        text = input("Enter the content of the note: ")
-        tags = input("Enter tags, separated by commas: ")
+        title = self.input("Enter the title of the note:  ")
+        text = self.input("Enter the content of the note: ")
+        tags = self.input("Enter tags, separated by commas: ")
+        return self.new_note(title, text, tags)
+
+    def new_note(self, title, text, tags):
         new_note = Note(
             title, text, tags
         )  # Створення нової нотатки з усіма необхідними аргументами
         self.note_book.add_note(new_note)  # Додавання нової нотатки до нотатника
         return "Note added"
 
+    @registry.command("edit_note", "<note title> <new content>", "Edits the content of a note.",
+                      parse=parse_edit_note, group="notes")
     def edit_note(
         self, note_title, new_content
-    ):  # Пошук та редагування нотатки за назвою
-        for note in self.note_book.data:
-            if note.title == note_title:  # Порівнюємо назву нотатки з вказаною
-                note.text = new_content  # Оновлюємо текст нотатки на новий зміст
-                return "Note updated successfully."
+    ):  # Пошук та редагування нотатки за назвою, індекс пошуку оновлюється в нотатнику
+        if self.note_book.edit_note(note_title, new_content):
+            return "Note updated successfully."
+        return "Note not found."
+
+    @registry.command("remove_note", "<note title>", "Removes a note.", parse=stripped_args, group="notes")
+    def remove_note(self, note_title):
+        if self.note_book.remove_note_by_title(note_title.lower()):
+            return "Note removed successfully."
         return "Note not found."
 
+    @registry.command("show_note", description="Displays all notes.", parse=no_args, group="notes")
     def show_note(self):
         if not self.note_book.data:
             return "No notes available"
         else:
             return "\n".join(str(note) for note in self.note_book.data)
 
-    # надання користувачу довідки щодо доступних команд для роботи з нотатками
+    # пошук нотаток за ключовими словами
+    @registry.command("search_note", "<keywords>", "Searches for notes by keywords (any of them, or all of them when joined with AND).",
+                      parse=stripped_args, group="notes")
     def search_note(self, search_query):
-        search_terms = search_query.lower().split()  # Розбиваємо пошуковий запит на слова
-        found_notes = [
-            note
-            for note in self.note_book.data
-            if any(term in note.title.lower() or term in note.text.lower() or term in ' '.join(note.tags).lower() for term in search_terms)
-        ]
-        if found_notes:
-            return "\n".join(str(note) for note in found_notes)
-        else:
-            return "No notes found matching '{search_query}'"
-
-        # надання користувачу довідки щодо доступних команд для роботи з нотатками
+        return self.note_book.search_note(search_query)
 
+    # довідка будується з реєстру команд
+    @registry.command("help", description="Displays help message for all commands.", parse=no_args)
     def help(self):
-        commands_help = {
-            "hello": "Displays a greeting message and offers assistance.",
-            "add_contact": "<name> <phone>: Adds a new contact.",
-            "change_contact_phone": "<name> <new phone>: Updates the phone number of a contact.",
-            "change_contact_name": "<old name>, <new name>: Updates the name of a contact", 
-            "add_phone": "<name> <phone>: Adds an additional phone number to an existing contact.",
-            "show_all_contacts": "Displays all contacts.",
-            "search_by_bd": "Searches for contacts whose birthday is within the next 14 days.",
-            "add_birthday": "<name> <birthday>: Adds a birthday to a contact.",
-            "add_email": "<name> <email>: Adds an email to a contact.",
-            "add_note": "Adds a new note.",
-            "search_note": "<keyword>: Searches for notes by keyword.",
-            "edit_note": "<note title> <new content>: Edits the content of a note.",
-            "remove_note": "<note title>: Removes a note.",
-            "show_note": "Displays all notes.",
-            "help_note": "Displays help message for note commands.",
-            "delete_contact": "<name>: Deletes a contact.",
-            "search_contacts": "<name or phone>: Searches contacts by name or phone.",
-            "sort_files": "<Path to the folder you want to sort>: Files sorted successfully.",
-        }
-
-        max_command_length = max(len(command) for command in commands_help.keys())
-        formatted_help = [f"{command.ljust(max_command_length)} : {description}" for command, description in commands_help.items()]
-        # Выводим отформатированный список команд
-        for line in formatted_help:
-            return "\n".join([f"{cmd}: {desc}" for cmd, desc in commands_help.items()])
+        return registry.help()
 
+    # надання користувачу довідки щодо доступних команд для роботи з нотатками
+    @registry.command("help_note", description="Displays help message for note commands.", parse=no_args, group="notes")
     def help_note(self):
-        commands = {
-            "add_note": "Add a new note. Usage: add_note your note here",
-            "search_note": "Search notes by keyword. Usage: search_note keyword",
-            "edit_note": "Edit an existing note. Usage: edit_note id new content",
-            "remove_note": "Remove a note. Usage: remove_note id",
-            "show_note": "Show all notes.",
-            "help_note": "Show this help message.",
-        }
-        return "\n".join([f"{cmd}: {desc}" for cmd, desc in commands.items()])
+        return registry.help("notes")
 
     # Видалення контакту
+    @registry.command("delete_contact", "<name>", "Deletes a contact.", group="contacts")
     def delete_contact(self, name):
         try: 
             self.address_book.delete(name)
@@ -272,137 +324,262 @@ class ContactBot:
         except ValueError:
             return "Invalid data format. Please provide both name and phone."
 
-    # Пошук контакту
+    # Пошук контакту за частиною імені чи телефону
+    @registry.command("search_contacts", "<name or phone>", "Searches contacts by name or phone.", group="contacts")
     def search_contacts(self, name):
-        found_records = [
-            record
-            for record in self.address_book.data.values()
-            if name.lower() in record.name.value.lower()
-            or any(name.lower() in phone.lower() for phone in record.phones)
-        ]
+        found_records = self.address_book.search(name)
         if found_records:
             return "\n".join(str(record) for record in found_records)
         else:
             return f"No contacts found matching '{name}'"
 
+    # масовий імпорт і експорт контактів у CSV чи JSON Lines (формат - за розширенням файлу)
+    @registry.command("import_contacts", "<path to .csv or .jsonl>", "Imports contacts from a file and reports rejected rows.",
+                      parse=stripped_args, group="contacts")
+    def import_contacts(self, filename):
+        from bot_assistant.contact_io import import_contacts
+        try:
+            return str(import_contacts(self.address_book, filename, self.lock))
+        except (ValueError, OSError) as error:
+            return f"Import failed: {error}"
+
+    @registry.command("export_contacts", "<path to .csv or .jsonl>", "Exports all contacts to a file.",
+                      parse=stripped_args, group="contacts")
+    def export_contacts(self, filename):
+        from bot_assistant.contact_io import export_contacts
+        try:
+            return f"Exported {export_contacts(self.address_book, filename, self.lock)} contacts to {filename}"
+        except (ValueError, OSError) as error:
+            return f"Export failed: {error}"
+
+    # перевірка, чи є вже такий номер телефону в книзі
+    def phone_exists(self, data):
+        phone = data.split()[-1] if data.split() else ""
+        return self.address_book.find_by_phone(phone) is not None
+
+    @registry.command("sort_files", "[--incremental] [--dedup[=skip|hardlink]] [--sort-archives] [--dry-run | --resume] <Path to the folder you want to sort>",
+                      "Files sorted successfully. With --incremental only new or changed files are processed, with --dedup files with already sorted content are left in place or hard-linked, with --sort-archives files from archives are sorted into categories instead of a separate folder. --dry-run only shows and saves the plan, --resume applies a saved or interrupted plan.",
+                      parse=parse_sort_files, group="files")
+    def sort_files(self, options, folder_path):
+        if not os.path.isdir(folder_path):
+            return f"Folder '{folder_path}' not found."
+        if options.pop("resume", False):
+            result = self.sorter.resume(folder_path, progress=show_progress)
+            if result is None:
+                return "There is no unfinished sorting plan in this folder."
+        else:
+            result = self.sorter.go(folder_path, workers=SORT_WORKERS, progress=show_progress, **options)
+            if options.get("dry_run"):
+                return f"{result}\nRun 'sort_files --resume {folder_path}' to apply the plan."
+        return f"Files sorted successfully.\n{result}"
+
+    # статистика сеансу: час команд, переглянуті пошуками записи, читання/запис книг, етапи сортування
+    @registry.command("stats", "[reset]", "Shows latency, search and persistence statistics (start otto with --stats), or resets them.",
+                      parse=parse_stats)
+    def stats(self, action=""):
+        if action == "reset":
+            STATS.reset()
+            return "Statistics reset."
+        return STATS.report()
+
+    # виконує команду під cProfile (з --memory - під tracemalloc) і записує профіль у файл
+    @registry.command("profile", "[--memory] <command>", "Runs a command under cProfile (or tracemalloc with --memory) and saves the profile.",
+                      parse=parse_profile)
+    def profile(self, memory, line):
+        from bot_assistant.instrumentation import profile_call
+        command, _ = registry.find(line)
+        if command is None or command.name in ("exit", "profile"):
+            return "Please provide a command to profile."
+        result, path, summary = profile_call(lambda: self.execute(line), command.name, memory)
+        return f"{result}\n{'-' * 50}\n{summary}\nProfile saved to {path}"
+
+    @registry.command("exit", description="Saves contacts and notes and exits.", parse=no_args,
+                      aliases=("good bye", "close", "."))
+    def exit(self):
+        self.close()
+        return exit_bot()
+
+    def close(self):
+        with self.lock:
+            if self.autosaver is not None:
+                self.autosaver.stop()
+            for book in self.opened_books():
+                book.save_to_json()
+                book.close()
+
+    # книги, які так і не відкривались, зберігати нема чого
+    def opened_books(self):
+        return [book for book in (self._address_book, self._note_book) if not callable(book)]
+
+    # (Command, аргументи) для рядка з командою або (None, повідомлення для користувача)
+    def prepare(self, line):
+        command, rest = registry.find(line)
+        if command is None:
+            return None, "Invalid command. Try again."
+        try:
+            return command, command.parse(rest)
+        except ValueError as error:
+            return None, str(error) or f"Invalid command format. Usage: {command.usage}"
+
+    # виконує один рядок з командою: назва шукається в реєстрі, решта рядка розбирається parse команди
+    def execute(self, line):
+        command, args = self.prepare(line)
+        if command is None:
+            return args
+        with self.lock:
+            if not STATS.enabled:
+                return command.handler(self, *args)
+            started = time.perf_counter()
+            try:
+                return command.handler(self, *args)
+            finally:
+                STATS.command(command.name, time.perf_counter() - started)
+
+    # дні народження шукаються у фоні, поки користувач уже може вводити команди
+    def start_birthday_scan(self):
+        def scan():
+            with self.lock:
+                print(self.search_by_bd())
+
+        thread = threading.Thread(target=scan, daemon=True)
+        thread.start()
+        return thread
+
     def main_in_bot(self):
-        while True:
-            command_completer = WordCompleter(COMMANDS)
-            print('-'*50) 
-            user_input_original = session.prompt("Enter command:  ") # зберігаємо оригінальний ввід від користувача з усіма великими і малими літерами
-            user_input = user_input_original.lower() # робимо lowercase для того, щоб в будь-якому разі виокремити команду
-            if user_input in ["good bye", "close", "exit", "."]:
-                self.address_book.save_to_json()
-                self.note_book.save_to_json()
-                return exit_bot()
-            elif user_input.startswith("sort_files"):
-                if len(user_input.split()) == 1:
-                    return "Please provide the path to the folder you want to sort."
-                else:
-                    folder_path = user_input_original[len("sort_files") + 1:].strip()
-                    self.sorter.go(folder_path)
-                    return "Files sorted successfully."
-            elif user_input.startswith("add_birthday"):
-                data = user_input_original[len("add_birthday") + 1 :]
-                return self.add_birthday(data)
-            elif user_input.startswith("add_email"):
-                data = user_input_original[len("add_email") + 1 :]
-                return self.add_email(data)
-            elif user_input == "hello":
-                return self.hello()
-            elif user_input.startswith("add_contact"):
-                data = user_input_original[len("add_contact") + 1 :]
-                for record in self.address_book.data.values():
-                    contact_info = f"{', '.join(record.phones)}"
-                    if contact_info[-10:] == data[-10:] or contact_info[-22:-12] == data[-10:]:
-                        return "The phone number you entered already exists"  # Введений вами номер телефону вже існує
-                return self.add_contact(data)
-            elif user_input.startswith("add_phone"):  # додає телефон до списку телефонів контакту. Як працюєЖ пишемо add_phone name
-                data = user_input_original[len("add_phone") + 1 :]
-                for record in self.address_book.data.values():
-                    contact_info = f"{', '.join(record.phones)}"
-                    if contact_info[-10:] == data[-10:] or contact_info[-22:-12] == data[-10:]:
-                        return "The phone number you entered already exists"  # Введений вами номер телефону вже існує
-                return self.add_phone(data)
-            elif user_input.startswith("add_note"):  # + Додає нотатку до нотатника.
-                if len(user_input.split()) > 1:
-                    return "Invalid command format. Usage: add_note"
-                else:
-                    return self.add_note()
-            elif user_input.startswith("search_note"):
-                search_query = user_input_original[len("search_note") + 1:].strip()
-                return self.search_note(search_query)
-            elif user_input.startswith("edit_note"):  # + Редагує існуючу нотатку. edit_note "назва рецепту" "новий зміст рецепту"
-                command, *args = (
-                    user_input_original.split()
-                )  # Розділяємо введену команду на частини
-                if (
-                    len(args) >= 2
-                ):  # Переконуємося, що користувач ввів ідентифікатор та новий зміст
-                    note_id = args[
-                        0
-                    ]  # Перше слово після команди - ідентифікатор нотатки
-                    new_content = " ".join(args[1:])  # Все інше - новий зміст нотатки
-                    return self.edit_note(note_id, new_content)
-                else:
-                    return "Please, provide both an ID and new content for the note."
-            elif user_input.startswith("remove_note"):  # + Видаляє нотатку.
-                note_title = user_input[
-                    len("remove_note")+1:
-                ].strip()  # Витягуємо назву нотатки і видаляємо зайві пробіли
-                if self.note_book.remove_note_by_title(note_title):
-                    return "Note removed successfully."
-                else:
-                    return "Note not found."
-            elif user_input.startswith("show_note"):  # + Виводить список всіх нотаток.
-                if len(user_input.split()) > 1:
-                    return "Invalid command format. Usage: show_note"
-                else:
-                    return self.show_note()
-            elif user_input.startswith("help_note"):  # + Виводить список доступних команд для нотатника.
-                if len(user_input.split()) > 1:
-                    return "Invalid command format. Usage: help_note"
-                else:
-                    return self.help_note()
-            elif user_input.startswith("help"):  # + Виводить список доступних всех команд.
-                if len(user_input.split()) > 1:
-                    return "Invalid command format. Usage: help"
-                else:
-                    return self.help()            
-            elif user_input.startswith("change_contact_phone"):
-                data = user_input_original[len("change_contact_phone") + 1 :]
-                return self.change_contact_phone(data)
-            elif user_input.startswith("change_contact_name"): 
-                data = user_input_original[len("change_contact_name") + 1 :]
-                return self.change_contact_name(data)
-            elif user_input == "show_all_contacts":
-                return self.show_all_contacts()
-            elif user_input.startswith("delete_contact"):
-                name = user_input_original[len("delete_contact") + 1 :]
-                return self.delete_contact(name)
-            elif user_input.startswith("search_contacts"):
-                name = user_input[len("search_contacts") + 1 :]
-                return self.search_contacts(name)
-            elif user_input == "search_by_bd":
-                return self.search_by_bd()
-            else:
-                return "Invalid command. Try again."
+        if self.session is None:
+            # prompt_toolkit імпортується і сесія з автодоповненнями створюється лише в інтерактивному режимі
+            from prompt_toolkit import PromptSession
+            from prompt_toolkit.completion import WordCompleter
+            self.session = PromptSession(completer=WordCompleter(COMMANDS))
+        print('-'*50)
+        user_input = self.session.prompt("Enter command:  ")  # команда шукається без урахування регістру, аргументи передаються як є
+        return self.execute(user_input)
 
 
-def main():
-    address_book = AddressBook("address_book.json")
-    note_book = NoteBook("notes.json")
-    bot = ContactBot(address_book, note_book)
+# Список команд для автодоповнення
+COMMANDS = registry.names()
+
+
+# розбирає параметри sort_files, що йдуть перед шляхом до папки
+def split_sort_options(data):
+    from bot_assistant.dedup import DEDUP_MODES
+    options = {}
+    words = data.strip().split(" ")
+    while words and words[0].startswith("--"):
+        option, _, value = words.pop(0).partition("=")
+        if option == "--incremental" and not value:
+            options["incremental"] = True
+        elif option == "--dedup" and value in ("", *DEDUP_MODES):
+            options["dedup"] = value or "skip"
+        elif option in ("--dry-run", "--resume", "--sort-archives") and not value:
+            options[option[2:].replace("-", "_")] = True
+        else:
+            return None, ""
+    # --resume виконує вже складений план, інші параметри до нього не застосовні
+    if options.get("resume") and len(options) > 1:
+        return None, ""
+    return options, " ".join(words).strip()
+
+
+# прогрес виконання плану сортування в одному рядку
+def show_progress(done, total):
+    print(f"\rMoved {done}/{total}", end="\n" if done == total else "", flush=True)
+
+
+# пакетний режим: команди з файлу чи stdin по одній у рядку, без пауз і підказок.
+# Порожні рядки і рядки з "#" пропускаються, "exit" завершує скрипт достроково.
+# Відповіді команд ідуть в out, помилки і звіт про час виконання - в report
+def run_batch(bot, lines, out=sys.stdout, report=sys.stderr):
+    lines = iter(lines)
+
+    # add_note читає назву, текст і теги з наступних рядків скрипта
+    def read_line(prompt=""):
+        line = next(lines, None)
+        if line is None:
+            raise EOFError("unexpected end of script")
+        return line.rstrip("\n")
+
+    bot.input = read_line
+    counts = Counter()
+    durations = defaultdict(float)
+    failed = 0
+    started = time.perf_counter()
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        command, _ = registry.find(line)
+        if command is not None and command.name == "exit":
+            break
+        name = command.name if command is not None else "<invalid>"
+        begin = time.perf_counter()
+        try:
+            result = bot.execute(line)
+        except Exception as error:
+            failed += 1
+            print(f"Error in '{line}': {error!r}", file=report)
+        else:
+            if result is not None:
+                print(result, file=out)
+        counts[name] += 1
+        durations[name] += time.perf_counter() - begin
+    elapsed = time.perf_counter() - started
+    begin = time.perf_counter()
+    bot.close()
+    saved = time.perf_counter() - begin
+    print_timing(counts, durations, elapsed, saved, report)
+    return failed
+
+
+def print_timing(counts, durations, elapsed, saved, report):
+    total = sum(counts.values())
+    print(f"{'command':<22} {'count':>7} {'total, ms':>10} {'mean, ms':>9}", file=report)
+    for name, duration in sorted(durations.items(), key=lambda item: -item[1]):
+        print(f"{name:<22} {counts[name]:>7} {duration * 1000:>10.1f} {duration * 1000 / counts[name]:>9.3f}", file=report)
+    rate = total / elapsed if elapsed else 0
+    print(f"{total} commands in {elapsed:.3f} s ({rate:.0f} commands/s), saved in {saved:.3f} s", file=report)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="otto", description="Personal bot-assistant for contacts, notes and files.")
+    parser.add_argument("--batch", metavar="FILE", type=argparse.FileType("r", encoding="utf-8"),
+                        help="run commands from FILE ('-' for stdin) and exit")
+    parser.add_argument("--serve", metavar="SOCKET", help="share the books with clients connecting to the Unix socket SOCKET")
+    parser.add_argument("--connect", metavar="SOCKET", help="send commands from stdin to the otto server at SOCKET")
+    parser.add_argument("--stats", action="store_true", help="collect latency and I/O statistics for the 'stats' command")
+    args = parser.parse_args(argv)
+    if args.stats:
+        STATS.enabled = True
+    # книги відкриваються при першій команді, якій вони потрібні
+    def address_book():
+        return AddressBook("address_book.json", storage=STORAGE)
+
+    def note_book():
+        return NoteBook("notes.json", storage=NOTE_STORAGE)
+
+    if args.connect:
+        from bot_assistant.server import connect
+        connect(args.connect)
+        return
+    if args.serve:
+        from bot_assistant.server import serve
+        serve(ContactBot(address_book, note_book, autosave=AUTOSAVE), args.serve)
+        return
+    if args.batch:
+        bot = ContactBot(address_book, note_book)
+        with args.batch:
+            failed = run_batch(bot, args.batch)
+        sys.exit(1 if failed else 0)
+    from prompt_toolkit.patch_stdout import patch_stdout
+    bot = ContactBot(address_book, note_book, autosave=AUTOSAVE)
     print(OTTO)
-    time.sleep(2)
-    print(bot.search_by_bd())
-    time.sleep(2)
     print("-"*50)
-    time.sleep(1)
     print("Hello my name is Otto. How can I help you?")
-    time.sleep(1)
-    while True:
-        print(bot.main_in_bot())
+    # patch_stdout - щоб результат фонового пошуку виводився над рядком вводу, а не посеред нього
+    with patch_stdout():
+        bot.start_birthday_scan()
+        while True:
+            print(bot.main_in_bot())
 
 
 def exit_bot() -> None:
@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+from bot_assistant.storage import write_atomic
+
+# службові файли сортувальника лежать в окремій папці, щоб їх запис
+# не змінював mtime папки, що сортується
+SERVICE_FOLDER = '.otto'
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+class Manifest:
+    # пам'ятає стан папок після попереднього сортування:
+    # відносний шлях папки -> {"mtime": ..., "subfolders": [...], "files": {ім'я: [розмір, mtime, inode, куди]}}.
+    # Папку, mtime якої не змінився, повторно не читаємо, а файли, що не змінились, не чіпаємо
+    def __init__(self, folder):
+        self.root = os.fspath(folder)
+        self.filename = os.path.join(self.root, SERVICE_FOLDER, MANIFEST_NAME)
+        self.folders = {}
+        self.visited = {}   # папки, пройдені в цьому запуску, з новим станом
+        self.unchanged_files = 0
+        self.unchanged_folders = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.filename, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get("version") == MANIFEST_VERSION:
+            self.folders = data["folders"]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        for key, state in self.visited.items():
+            try:
+                # mtime після переміщень, інакше наступний запуск знову читав би цю папку
+                state["mtime"] = os.stat(self.path(key)).st_mtime_ns
+            except FileNotFoundError:
+                state["mtime"] = None
+        self.folders = self.visited
+        self.visited = {}
+        write_atomic(self.filename, json.dumps({"version": MANIFEST_VERSION, "folders": self.folders}))
+
+    def key(self, path):
+        return os.path.relpath(path, self.root)
+
+    def path(self, key):
+        return os.path.normpath(os.path.join(self.root, key))
+
+    def unchanged_folder(self, path):
+        # список підпапок, якщо папка не змінилась з минулого разу, інакше None
+        key = self.key(path)
+        state = self.folders.get(key)
+        if state is None:
+            return None
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        if mtime != state["mtime"]:
+            return None
+        self.visited[key] = state
+        self.unchanged_folders += 1
+        return [self.path(subfolder) for subfolder in state["subfolders"]]
+
+    def begin_folder(self, path):
+        self.visited[self.key(path)] = {"mtime": None, "subfolders": [], "files": {}}
+
+    def end_folder(self, path, subfolders):
+        self.visited[self.key(path)]["subfolders"] = [self.key(subfolder) for subfolder in subfolders]
+
+    def unchanged_file(self, entry):
+        key = self.key(os.path.dirname(entry.path))
+        stat = entry.stat()
+        current = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+        previous = self.folders.get(key, {}).get("files", {}).get(entry.name)
+        unchanged = previous is not None and previous[:3] == current
+        self.visited[key]["files"][entry.name] = current + [previous[3] if unchanged else None]
+        if unchanged:
+            self.unchanged_files += 1
+        return unchanged
+
+    def assign(self, path, target):
+        # куди вирішили перемістити файл
+        with self.lock:
+            files = self.visited[self.key(os.path.dirname(path))]["files"]
+            files[os.path.basename(path)][3] = self.key(target)
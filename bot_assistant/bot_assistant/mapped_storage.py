@@ -0,0 +1,337 @@
+import os
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from weakref import WeakValueDictionary
+from bot_assistant.instrumentation import STATS
+from bot_assistant.snapshot import (BIRTHDAY_INDEX, EMAIL_MARK, FIELD_SEPARATOR, NAMES, SEARCH, SORTED, Snapshot,
+                                    encode_snapshot, json_to_snapshot, snapshot_name)
+
+# скільки останніх прочитаних контактів завжди тримати в пам'яті
+CACHE_SIZE = int(os.environ.get("OTTO_MAPPED_CACHE", "4096"))
+
+
+def record_row(record):
+    return record.name.value, list(record.phones), record.email.value, record.birthday.date
+
+
+def failed(error):
+    raise error
+
+
+class MappedContactStorage:
+    # контакти читаються прямо з бінарного знімка з індексами (див. snapshot.py), відкритого через mmap:
+    # при запуску читається лише заголовок, а Record створюється, коли до контакту звертаються.
+    # Кілька процесів, що відкрили той самий знімок, ділять його сторінки в кеші ОС.
+    # Сам знімок не змінюється: змінені й нові контакти живуть у пам'яті поверх нього,
+    # а save записує новий знімок і відкриває його замість старого.
+    # Сховище одночасно є індексом книги, як SQLiteContactStorage.
+    lazy = True
+    prevalidated = False
+
+    def __init__(self, filename):
+        self.filename = filename  # json-файл, з якого створюється знімок, якщо його ще нема
+        self.snapshot_name = snapshot_name(filename)
+        self.snapshot = None
+        self.records = None
+        self.changed = {}      # ім'я -> змінений чи новий запис
+        self.overlay = None    # ContactIndex для записів з changed
+        self.deleted = set()   # видалені контакти знімка
+        self.added = set()     # контакти з changed, яких нема в знімку
+
+    def open(self, book):
+        self.overlay = type(book.index)()
+        self.map_snapshot()
+        self.records = MappedRecords(self, book)
+        return self.records, self
+
+    def map_snapshot(self):
+        # json-файл чи знімок без індексів (його пише сховище binary) один раз переписуються в знімок з індексами
+        if not os.path.exists(self.snapshot_name):
+            try:
+                json_to_snapshot(self.filename, self.snapshot_name, indexed=True)
+            except FileNotFoundError:
+                self.write_rows([])
+        snapshot = Snapshot(self.snapshot_name)
+        if not snapshot.indexed:
+            with snapshot:
+                rows = list(snapshot.rows())
+            self.write_rows(rows)
+            snapshot = Snapshot(self.snapshot_name)
+        self.snapshot = snapshot
+        self.order = snapshot.numbers(SORTED, "I")
+        self.birthdays = snapshot.numbers(BIRTHDAY_INDEX, "Q")
+        self.names_start, self.names_offsets = snapshot.string_index(NAMES)
+        self.search_start, self.search_offsets = snapshot.string_index(SEARCH)
+
+    def write_rows(self, rows):
+        from bot_assistant.storage import write_atomic
+        write_atomic(self.snapshot_name, encode_snapshot(rows, indexed=True))
+
+    def rows(self):
+        # поточний стан книги: контакти знімка з урахуванням змін, далі нові
+        for row in self.snapshot.rows():
+            name = row[0]
+            if name in self.deleted:
+                continue
+            record = self.changed.get(name)
+            yield row if record is None else record_row(record)
+        for name, record in self.changed.items():
+            if name in self.added:
+                yield record_row(record)
+
+    def save(self, book):
+        if not (self.changed or self.deleted):
+            return
+        from bot_assistant.storage import write_atomic
+        content = encode_snapshot(list(self.rows()), indexed=True)
+        # на Windows відкритий через mmap файл не можна замінити, тож старий знімок закривається заздалегідь
+        self.close()
+        try:
+            write_atomic(self.snapshot_name, content)
+        finally:
+            self.map_snapshot()
+        # тепер змінені записи є в знімку; вже видані об'єкти лишаються в кеші
+        for record in self.changed.values():
+            self.records.remember(record)
+        self.changed.clear()
+        self.overlay.clear()
+        self.deleted.clear()
+        self.added.clear()
+
+    def flush(self, book):
+        self.save(book)
+
+    # знімок переписується одразу, під замком бота: поки він відкривається заново, читати книгу не можна.
+    # Помилку запису автозбереження отримає з повернутої функції і спробує ще раз
+    def checkpoint(self, book):
+        try:
+            self.save(book)
+        except OSError as error:
+            return lambda: failed(error)
+        return None
+
+    def files(self):
+        return [self.snapshot_name]
+
+    def log(self, book, op, name, item=None):
+        pass
+
+    def iter_items(self):
+        for record in self.records.values():
+            yield record.to_dict()
+
+    def close(self):
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+
+    # ---- знімок ----
+
+    def number(self, name):
+        # номер контакту в знімку: двійковий пошук серед імен у порядку розділу ORDR.
+        # Порядок байтів UTF-8 збігається з порядком рядків, тож імена порівнюються без decode
+        key = name.encode("utf-8")
+        order, start, offsets, data = self.order, self.names_start, self.names_offsets, self.snapshot.map
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            number = order[middle]
+            if data[start + offsets[number]:start + offsets[number + 1] - 1] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(order):
+            number = order[low]
+            if data[start + offsets[number]:start + offsets[number + 1] - 1] == key:
+                return number
+        return None
+
+    def shadowed(self, name):
+        # контакт знімка змінено чи видалено - його дані в знімку застаріли
+        return name in self.changed or name in self.deleted
+
+    def scan(self, needle):
+        # номери контактів, у рядку пошуку яких є needle; mmap.find шукає без копіювання розділу
+        start, offsets = self.search_start, self.search_offsets
+        end = start + offsets[-1]
+        position = self.snapshot.map.find(needle, start, end)
+        while position != -1:
+            number = bisect_right(offsets, position - start) - 1
+            yield number
+            position = self.snapshot.map.find(needle, start + offsets[number + 1], end)
+
+    def names(self):
+        for number in range(len(self.snapshot)):
+            name = self.snapshot.string(NAMES, number)
+            if name not in self.deleted:
+                yield name
+        for name in self.changed:
+            if name in self.added:
+                yield name
+
+    def count(self):
+        return len(self.snapshot) - len(self.deleted) + len(self.added)
+
+    def contains(self, name):
+        if name in self.changed:
+            return True
+        return name not in self.deleted and self.number(name) is not None
+
+    def put_many(self, records):
+        for record in records:
+            record.book = self.records.book
+            self._put(record)
+        self.overlay.add_many(records)
+
+    def _put(self, record):
+        name = record.name.value
+        self.changed[name] = record
+        self.records.forget(name)
+        if name in self.deleted:
+            self.deleted.discard(name)
+        elif name not in self.added and self.number(name) is None:
+            self.added.add(name)
+
+    # ---- інтерфейс ContactIndex ----
+
+    def update(self, record):
+        self._put(record)
+        self.overlay.update(record)
+
+    add = update
+
+    def remove(self, name):
+        if self.changed.pop(name, None) is not None:
+            self.overlay.remove(name)
+        self.records.forget(name)
+        if name in self.added:
+            self.added.discard(name)
+        elif self.number(name) is not None:
+            self.deleted.add(name)
+
+    def find_phone(self, phone):
+        name = self.overlay.find_phone(phone)
+        if name is not None:
+            return name
+        for number in self.scan((FIELD_SEPARATOR + phone).encode("utf-8")):
+            name, phones, _, _ = self.snapshot.row(number)
+            if phone in phones and not self.shadowed(name):
+                return name
+        return None
+
+    def find_email(self, email):
+        email = email.lower()
+        names = set(self.overlay.find_email(email))
+        for number in self.scan((EMAIL_MARK + email + "\0").encode("utf-8")):
+            name, _, record_email, _ = self.snapshot.row(number)
+            if record_email and record_email.lower() == email and not self.shadowed(name):
+                names.add(name)
+        return names
+
+    def search(self, query):
+        query = query.lower()
+        if not query:
+            return set(self.names())
+        names = self.overlay.search(query) if self.changed else set()
+        scanned = 0
+        for number in self.scan(query.encode("utf-8")):
+            scanned += 1
+            name, phones, _, _ = self.snapshot.row(number)
+            if (query in name.lower() or any(query in phone for phone in phones)) and not self.shadowed(name):
+                names.add(name)
+        if STATS.enabled:
+            STATS.scanned("search_contacts", scanned)
+        return names
+
+    def birthdays_between(self, first, last):
+        # розділ BIDX уже відсортований за (місяць, день, ім'я), тож діапазон знаходиться двійковим пошуком
+        start = bisect_left(self.birthdays, (first[0] * 32 + first[1]) << 32)
+        stop = bisect_left(self.birthdays, (last[0] * 32 + last[1] + 1) << 32)
+        found = []
+        for value in self.birthdays[start:stop]:
+            name = self.snapshot.string(NAMES, value & 0xFFFFFFFF)
+            if not self.shadowed(name):
+                found.append((value >> 32, name))
+        if self.changed:
+            for name in self.overlay.birthdays_between(first, last):
+                month, day, _ = self.overlay.keys[name][3]
+                found.append((month * 32 + day, name))
+            found.sort()
+        return [name for _, name in found]
+
+
+class MappedRecords(MutableMapping):
+    # словник контактів поверх знімка. Record створюється лише при зверненні до контакту;
+    # останні size прочитаних записів тримаються в пам'яті, решта - доки на них є посилання,
+    # щоб зміни йшли в той самий об'єкт
+    def __init__(self, storage, book, size=CACHE_SIZE):
+        self.storage = storage
+        self.book = book
+        self.size = size
+        self.cache = WeakValueDictionary()
+        self.recent = OrderedDict()
+
+    def remember(self, record):
+        name = record.name.value
+        self.cache[name] = record
+        self.recent[name] = record
+        self.recent.move_to_end(name)
+        if len(self.recent) > self.size:
+            self.recent.popitem(last=False)
+        return record
+
+    def forget(self, name):
+        self.cache.pop(name, None)
+        self.recent.pop(name, None)
+
+    def _load(self, number, name):
+        record = self.cache.get(name)
+        if record is None:
+            record = self.book.record_class.from_trusted(*self.storage.snapshot.row(number))
+            record.book = self.book
+        return self.remember(record)
+
+    def __getitem__(self, name):
+        storage = self.storage
+        record = storage.changed.get(name)
+        if record is not None:
+            return record
+        if name in storage.deleted:
+            raise KeyError(name)
+        record = self.cache.get(name)
+        if record is not None:
+            return self.remember(record)
+        number = storage.number(name)
+        if number is None:
+            raise KeyError(name)
+        return self._load(number, name)
+
+    def __setitem__(self, name, record):
+        self.storage.update(record)
+
+    def __delitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        self.storage.remove(name)
+
+    def __iter__(self):
+        return self.storage.names()
+
+    def __len__(self):
+        return self.storage.count()
+
+    def __contains__(self, name):
+        return self.storage.contains(name)
+
+    def values(self):
+        storage = self.storage
+        for number in range(len(storage.snapshot)):
+            name = storage.snapshot.string(NAMES, number)
+            if name in storage.deleted:
+                continue
+            record = storage.changed.get(name)
+            yield record if record is not None else self._load(number, name)
+        for name, record in list(storage.changed.items()):
+            if name in storage.added:
+                yield record
@@ -0,0 +1,51 @@
+from functools import lru_cache
+
+CYRILLIC_SYMBOLS = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюяєіїґ'
+TRANSLATION = ("a", "b", "v", "g", "d", "e", "e", "j", "z", "i", "j", "k", "l", "m", "n", "o", "p", "r", "s", "t", "u",
+               "f", "h", "ts", "ch", "sh", "sch", "", "y", "", "e", "yu", "u", "ja", "je", "ji", "g")
+
+# алфавіт для транслітерації: мала літера -> латиниця, великі літери додаються автоматично
+CYRILLIC = dict(zip(CYRILLIC_SYMBOLS, TRANSLATION))
+
+# скільки останніх імен пам'ятати: при сортуванні ті самі імена трапляються знову й знову
+CACHE_SIZE = 65536
+
+
+class TranslateTable(dict):
+    # таблиця для str.translate, що одночасно транслітерує і замінює на "_" все,
+    # що не є літерою, цифрою чи "_" (як re.sub(r'\W', '_', ...)).
+    # Наперед заповнені лише літери алфавіту, решта символів визначаються при першій зустрічі
+    def __init__(self, alphabet: dict):
+        super().__init__()
+        for letter, latin in alphabet.items():
+            self[ord(letter)] = latin
+            self[ord(letter.upper())] = latin.upper()
+
+    def __missing__(self, code: int):
+        char = chr(code)
+        value = code if char.isalnum() or char == "_" else "_"
+        self[code] = value
+        return value
+
+
+class Normalizer:
+    # нормалізує ім'я файлу (без розширення) за один прохід str.translate
+    def __init__(self, alphabet: dict = CYRILLIC, cache_size: int = CACHE_SIZE):
+        self.alphabet = alphabet
+        self.cache_size = cache_size
+        self.table = TranslateTable(alphabet)
+        self.normalize = lru_cache(maxsize=cache_size)(self._normalize)
+
+    def _normalize(self, name: str) -> str:
+        base_name, dot, extension = name.rpartition(".")
+        return f"{base_name.translate(self.table)}{dot}{extension}"
+
+    def __call__(self, name: str) -> str:
+        return self.normalize(name)
+
+    # кеш не передається в інші процеси, лише алфавіт
+    def __getstate__(self):
+        return {"alphabet": self.alphabet, "cache_size": self.cache_size}
+
+    def __setstate__(self, state):
+        self.__init__(state["alphabet"], state["cache_size"])
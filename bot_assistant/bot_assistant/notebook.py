@@ -1,62 +1,238 @@
-import json
+import re
+import sys
+from bisect import bisect_left, insort
 from datetime import datetime
-from collections import UserList
+from collections import UserList, defaultdict
+from bot_assistant.instrumentation import STATS, measured_io
+from bot_assistant.json_stream import batched
+from bot_assistant.storage import NOTE_STORAGES, make_storage
+
+
+TOKEN_RE = re.compile(r"\w+")
+
+# вага входження слова залежно від поля нотатки
+TITLE_WEIGHT = 3
+TAGS_WEIGHT = 2
+TEXT_WEIGHT = 1
 
 
 class Note:
+    __slots__ = ("title", "text", "tags", "creation_date", "id")
+
     def __init__(self, title, text, tags):
         self.title = title                   # Назва
         self.text = text                     # Зміст
-        self.tags = tags.split(",")          # Теги
+        self.tags = [sys.intern(tag) for tag in tags.split(",")]  # Теги; однакові теги - один рядок у пам'яті
         self.creation_date = datetime.now()  # сьогоднішня дата
+        self.id = None                       # номер запису в базі, якщо нотатки зберігаються в sqlite
+
+    def to_dict(self):
+        return {"title": self.title, "text": self.text, "tags": list(self.tags), "creation_date": str(self.creation_date)}
+
+    @classmethod
+    def from_dict(cls, item):
+        note = cls(item['title'], item['text'], ','.join(item['tags']))
+        note.creation_date = datetime.fromisoformat(item['creation_date'])
+        return note
 
     def __str__(self):
         return f"{self.creation_date}\n- {self.title}\n- {self.text}\n- {self.tags}"
 
 
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class NoteIndex:
+    # інвертований індекс: слово -> {нотатка: вага}
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.vocabulary = []   # відсортований список слів для пошуку за префіксом
+        self.note_terms = {}   # нотатка -> {слово: вага}, щоб швидко видаляти
+
+    def clear(self):
+        self.postings.clear()
+        self.vocabulary.clear()
+        self.note_terms.clear()
+
+    @staticmethod
+    def note_weights(note):
+        weights = defaultdict(int)
+        for token in tokenize(note.title):
+            weights[token] += TITLE_WEIGHT
+        for tag in note.tags:
+            for token in tokenize(tag):
+                weights[token] += TAGS_WEIGHT
+        for token in tokenize(note.text):
+            weights[token] += TEXT_WEIGHT
+        return weights
+
+    def add(self, note):
+        weights = self.note_weights(note)
+        self.note_terms[note] = weights
+        for token, weight in weights.items():
+            posting = self.postings[token]
+            if not posting:
+                insort(self.vocabulary, token)
+            posting[note] = weight
+
+    def remove(self, note):
+        weights = self.note_terms.pop(note, None)
+        if not weights:
+            return
+        for token in weights:
+            posting = self.postings[token]
+            posting.pop(note, None)
+            if not posting:
+                del self.postings[token]
+                del self.vocabulary[bisect_left(self.vocabulary, token)]
+
+    def update(self, note):
+        self.remove(note)
+        self.add(note)
+
+    def matches(self, term):
+        # всі слова словника, що починаються з term, і їхні нотатки
+        found = {}
+        start = bisect_left(self.vocabulary, term)
+        for token in self.vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            for note, weight in self.postings[token].items():
+                found[note] = found.get(note, 0) + weight
+        return found
+
+    def search(self, terms, mode="or"):
+        scores = None
+        scanned = 0
+        for term in terms:
+            found = self.matches(term)
+            scanned += len(found)
+            if scores is None:
+                scores = found
+            elif mode == "and":
+                scores = {note: score + found[note] for note, score in scores.items() if note in found}
+            else:
+                for note, score in found.items():
+                    scores[note] = scores.get(note, 0) + score
+            if mode == "and" and not scores:
+                break
+        if STATS.enabled:
+            STATS.scanned("search_note", scanned)
+        if not scores:
+            return []
+        # спочатку найрелевантніші, серед рівних - новіші
+        return sorted(scores, key=lambda note: (scores[note], note.creation_date), reverse=True)
+
+
+def parse_query(search_query):
+    # "кава AND чай" - нотатки з обома словами, інакше - з будь-яким
+    words = search_query.split()
+    mode = "and" if "AND" in words else "or"
+    terms = []
+    for word in words:
+        if word in ("AND", "OR"):
+            continue
+        terms.extend(tokenize(word))
+    return terms, mode
+
+
 class NoteBook(UserList):
-    def __init__(self, filename):
+    # storage: "json" - весь файл перезаписується при збереженні,
+    # "sqlite" - нотатки читаються з бази за потреби (див. storage.py)
+    note_class = Note
+
+    def __init__(self, filename, storage="json"):
         self.filename = filename
+        self.index = NoteIndex()
+        self.storage = make_storage(storage, filename, NOTE_STORAGES)
+        self.changes = 0        # змін з останнього збереження (див. autosave.py)
+        self.on_change = None   # викликається після кожної зміни
         super().__init__()
         self.load_from_json()
 
     def add_note(self, note):
+        self._append(note)
+        self.touch()
+
+    def _append(self, note):
         self.append(note)
+        self.index.add(note)
+
+    def touch(self):
+        self.changes += 1
+        if self.on_change is not None:
+            self.on_change()
+
+    def edit_note(self, title, new_content):
+        for note in self.data:
+            if note.title == title:
+                note.text = new_content
+                self.index.update(note)
+                self.touch()
+                return True
+        return False
+
+    def dump(self):
+        return [note.to_dict() for note in self.data]
+
+    # знімок для автозбереження: функція, що допише його на диск, або None, якщо все вже записано
+    def checkpoint(self):
+        self.changes = 0
+        return self.storage.checkpoint(self)
 
+    @measured_io("save")
     def save_to_json(self):
-        with open(self.filename, "w") as fh:
-            json.dump([{"title": note.title, "text": note.text, "tags": note.tags, "creation_date": str(note.creation_date)} for note in self.data], fh, indent=4)
+        self.changes = 0
+        self.storage.save(self)
+
+    def close(self):
+        self.storage.close()
 
     def remove_note_by_title(self, title):
         for i, note in enumerate(self.data):
             if note.title.lower() == title:
                 del self.data[i]
+                self.index.remove(note)
+                self.touch()
                 return True
         return False
 
-    def search_note(self, search_query):
-        search_terms = search_query.lower().split()  # Розбиваємо пошуковий запит на слова
-        found_notes = [
-            note
-            for note in self.data
-            if any(term in note.title.lower() or term in note.text.lower() or term in ' '.join(note.tags).lower() for term in search_terms)
-        ]
+    def find_notes(self, search_query, mode=None):
+        terms, query_mode = parse_query(search_query)
+        return self.index.search(terms, mode or query_mode)
+
+    def search_note(self, search_query, mode=None):
+        found_notes = self.find_notes(search_query, mode)
         if found_notes:
             return "\n".join(str(note) for note in found_notes)
         else:
-            return "No notes found matching '{search_query}'"
+            return f"No notes found matching '{search_query}'"
 
+    @measured_io("load")
     def load_from_json(self):
+        self.changes = 0
+        if self.storage.lazy:
+            self.data, self.index = self.storage.open(self)
+            return
         try:
-            with open(self.filename, "r") as fh:
-                data = json.load(fh)
-                if not data:
-                    return "The JSON file is empty."
-                else:
+            loaded = False
+            for item in self.storage.load():
+                if not loaded:
                     self.data.clear()
-                    for item in data:
-                        note = Note(item['title'], item['text'], ','.join(item['tags']))
-                        note.creation_date = datetime.strptime(item['creation_date'], '%Y-%m-%d %H:%M:%S.%f')
-                        self.add_note(note)  # Додаємо об'єкт note до списку
+                    self.index.clear()
+                    loaded = True
+                self._append(self.note_class.from_dict(item))  # Додаємо об'єкт note до списку
+            if not loaded:
+                return "The JSON file is empty."
         except FileNotFoundError:
             return "File not found. Creating a new note book."
+
+    # from_file=True - нотатки читаються прямо зі сховища по одній
+    def iterator(self, part_note=1, from_file=False):
+        if from_file:
+            notes = (self.note_class.from_dict(item) for item in self.storage.iter_items())
+        else:
+            notes = iter(self.data)
+        yield from batched(notes, part_note)
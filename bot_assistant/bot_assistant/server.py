@@ -0,0 +1,257 @@
+import asyncio
+import os
+import signal
+import socket
+import stat
+import sys
+import time
+from functools import partial
+from bot_assistant.instrumentation import STATS
+from bot_assistant.main import ContactBot, registry
+
+# Протокол: клієнт надсилає команду одним рядком UTF-8, сервер відповідає рядками тексту
+# і рядком "." в кінці; рядки відповіді, що починаються з ".", отримують ще одну "." попереду (як у SMTP).
+# add_note надсилає запитання тим самим способом і чекає на відповідь наступним рядком.
+END = "."
+
+
+def encode_response(text):
+    lines = str(text).rstrip("\n").split("\n")
+    stuffed = [f".{line}" if line.startswith(END) else line for line in lines]
+    return ("\n".join(stuffed) + f"\n{END}\n").encode("utf-8")
+
+
+async def read_response(reader):
+    lines = []
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise EOFError("server closed the connection")
+        line = line.decode("utf-8").rstrip("\n")
+        if line == END:
+            return "\n".join(lines)
+        lines.append(line[1:] if line.startswith(END) else line)
+
+
+class AsyncContactBot:
+    # асинхронне ядро над ContactBot: всі клієнти працюють з одними книгами в пам'яті.
+    # Команди з книгами короткі й виконуються прямо в циклі подій, тож не перетинаються;
+    # довгі команди (сортування файлів, імпорт і експорт, profile) ідуть у пулі потоків,
+    # запис json - теж, з готового знімка книги
+    def __init__(self, bot: ContactBot):
+        self.bot = bot
+        self.save_lock = asyncio.Lock()
+        # команди, яким потрібна окрема асинхронна версія
+        self.handlers = {"add_note": self.add_note, "sort_files": self.sort_files, "exit": self.exit,
+                         "profile": self.profile}
+        # команди, що можуть іти довго: виконуються в пулі потоків і самі беруть замок бота
+        # лише на короткі частини роботи (див. contact_io.py)
+        self.background = {"import_contacts", "export_contacts"}
+        # команди, що питають клієнта; profile їх не виконує
+        self.interactive = {"add_note"}
+
+    async def open(self):
+        # книги відкриваються один раз на весь сервер, поза циклом подій
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: (self.bot.address_book, self.bot.note_book))
+
+    # ask(prompt) - асинхронно питає клієнта і повертає його відповідь
+    async def execute(self, line, ask=None):
+        command, args = self.bot.prepare(line)
+        if command is None:
+            return args
+        started = time.perf_counter()
+        try:
+            handler = self.handlers.get(command.name)
+            if handler is not None:
+                return await handler(*args, ask=ask)
+            if command.name in self.background:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, partial(command.handler, self.bot, *args))
+            return await self.run_locked(command.handler, self.bot, *args)
+        finally:
+            if STATS.enabled:
+                STATS.command(command.name, time.perf_counter() - started)
+
+    async def run_locked(self, function, *args):
+        # коротка дія під замком бота: одразу в циклі подій, а якщо замок зайнятий (автозбереженням
+        # чи довгою командою) - чекаємо на нього в пулі потоків, щоб не зупиняти решту клієнтів
+        if self.bot.lock.acquire(blocking=False):
+            try:
+                return function(*args)
+            finally:
+                self.bot.lock.release()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self.locked, function, *args))
+
+    def locked(self, function, *args):
+        with self.bot.lock:
+            return function(*args)
+
+    async def profile(self, memory, line, ask=None):
+        # ContactBot.add_note читав би відповіді з stdin сервера, а не від клієнта
+        command, _ = registry.find(line)
+        if command is not None and command.name in self.interactive:
+            return f"{command.name} can't be profiled over the server."
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self.bot.profile, memory, line))
+
+    async def add_note(self, ask=None):
+        if ask is None:
+            return "This command needs an interactive client."
+        title = await ask("Enter the title of the note:  ")
+        text = await ask("Enter the content of the note: ")
+        tags = await ask("Enter tags, separated by commas: ")
+        return await self.run_locked(self.bot.new_note, title, text, tags)
+
+    async def sort_files(self, options, folder_path, ask=None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self.bot.sort_files, options, folder_path))
+
+    # exit закриває лише з'єднання клієнта, а книги при цьому зберігаються
+    async def exit(self, ask=None):
+        await self.save()
+        return "Good bye!"
+
+    async def save(self):
+        # знімок робиться в циклі подій, а серіалізація і запис json - у пулі потоків;
+        # журнал і sqlite зберігають зміни поступово, тут лише фіксація
+        async with self.save_lock:
+            loop = asyncio.get_running_loop()
+            writes = await self.run_locked(
+                lambda: [book.checkpoint() for book in self.bot.opened_books() if book.changes])
+            for write in writes:
+                if write is not None:
+                    await loop.run_in_executor(None, write)
+
+    async def close(self):
+        # повне збереження (журнал при цьому ущільнюється) і закриття книг
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.bot.close)
+
+
+class BotServer:
+    # сервер на Unix-сокеті: кожен клієнт - окремий потік команд до спільного AsyncContactBot
+    def __init__(self, bot: AsyncContactBot, path):
+        self.bot = bot
+        self.path = path
+
+    async def handle(self, reader, writer):
+        async def ask(prompt):
+            writer.write(encode_response(prompt))
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                raise EOFError("client closed the connection")
+            return line.decode("utf-8").rstrip("\r\n")
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode("utf-8").rstrip("\r\n")
+                command, _ = registry.find(line)
+                try:
+                    result = await self.bot.execute(line, ask)
+                except (EOFError, ConnectionError):
+                    raise
+                except Exception as error:
+                    result = f"Error: {error!r}"
+                writer.write(encode_response(result))
+                await writer.drain()
+                if command is not None and command.name == "exit":
+                    break
+        except (EOFError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, ready=None):
+        remove_stale_socket(self.path)
+        await self.bot.open()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        server = await asyncio.start_unix_server(self.handle, path=self.path)
+        try:
+            async with server:
+                if ready is not None:
+                    ready()
+                await stop.wait()
+        finally:
+            await self.bot.close()
+            if is_socket(self.path):
+                os.unlink(self.path)
+
+
+def is_socket(path):
+    try:
+        return stat.S_ISSOCK(os.lstat(path).st_mode)
+    except FileNotFoundError:
+        return False
+
+
+def remove_stale_socket(path):
+    # видаляє лише сокет, що лишився від попереднього запуску; звичайний файл
+    # чи сокет сервера, який ще працює, не чіпаємо
+    if not os.path.lexists(path):
+        return
+    if not is_socket(path):
+        raise FileExistsError(f"{path} exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise FileExistsError(f"Another otto server is listening on {path}")
+
+
+async def request(path, lines):
+    # надсилає рядки по одному і збирає відповіді (на запитання add_note відповідають наступні рядки)
+    reader, writer = await asyncio.open_unix_connection(path)
+    responses = []
+    try:
+        for line in lines:
+            writer.write(f"{line}\n".encode("utf-8"))
+            await writer.drain()
+            responses.append(await read_response(reader))
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    return responses
+
+
+def serve(bot: ContactBot, path):
+    try:
+        asyncio.run(BotServer(AsyncContactBot(bot), path).serve(ready=lambda: print(f"Otto is listening on {path}")))
+    except FileExistsError as error:
+        print(f"Can't start the server: {error}", file=sys.stderr)
+        sys.exit(1)
+
+
+def connect(path, lines=sys.stdin, out=sys.stdout):
+    # простий клієнт: кожен рядок вводу - команда або відповідь на запитання сервера
+    async def run():
+        reader, writer = await asyncio.open_unix_connection(path)
+        try:
+            for line in lines:
+                writer.write(line.rstrip("\n").encode("utf-8") + b"\n")
+                await writer.drain()
+                response = await read_response(reader)
+                print(response, file=out)
+                if response == "Good bye!":
+                    break
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    asyncio.run(run())
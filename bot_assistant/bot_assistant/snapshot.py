@@ -0,0 +1,304 @@
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+from datetime import date
+
+# Бінарний знімок адресної книги. Всі числа - little-endian.
+#   заголовок:  MAGIC, версія u16, прапорці u16, кількість контактів u32, кількість розділів u32, crc32 u32
+#   каталог:    для кожного розділу - тег (4 байти), зсув u64 і довжина u64 від початку файлу
+#   розділи:    вирівняні на 8 байтів; crc32 рахується від початку каталогу до кінця файлу
+# Рядкові розділи (імена, телефони, email): (кількість + 1) зсувів u64, далі рядки UTF-8,
+# кожен з "\0" у кінці. Рядок i - байти від зсуву i до зсуву i + 1 без "\0" у кінці, тож будь-який
+# рядок читається прямо з mmap, а всі разом - одним decode і split.
+# Телефони одного контакту записані через кому, порожній email - контакт без email.
+# Дні народження - i32 на контакт: date.toordinal() або 0, якщо дня народження нема.
+# Необов'язкові розділи-індекси (їх пише encode_snapshot(rows, indexed=True), див. mapped_storage.py):
+#   ORDR - номери контактів u32, відсортовані за іменем;
+#   SRCH - рядковий розділ: ім'я в нижньому регістрі й телефони через "\1", далі "\2" і email у нижньому регістрі;
+#   BIDX - u64 (місяць * 32 + день) << 32 | номер контакту для контактів з днем народження,
+#          відсортовані за (місяць, день, ім'я).
+MAGIC = b"OTTOSNAP"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIII")
+SECTION = struct.Struct("<4sQQ")
+OFFSET = struct.Struct("<Q")
+OFFSETS = struct.Struct("<QQ")  # початок і кінець рядка
+ORDINAL = struct.Struct("<i")
+ALIGN = 8
+END = "\0"
+PHONE_SEPARATOR = ","
+
+NAMES = b"NAME"
+PHONES = b"PHON"
+EMAILS = b"MAIL"
+BIRTHDAYS = b"BDAY"
+SORTED = b"ORDR"
+SEARCH = b"SRCH"
+BIRTHDAY_INDEX = b"BIDX"
+INDEXES = (SORTED, SEARCH, BIRTHDAY_INDEX)
+FIELD_SEPARATOR = "\1"
+EMAIL_MARK = "\2"
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def snapshot_name(filename):
+    return os.path.splitext(filename)[0] + ".snap"
+
+
+def encode_strings(values):
+    encoded = [value.encode("utf-8") for value in values]
+    text = b"".join(value + b"\0" for value in encoded)
+    if text.count(b"\0") != len(encoded):
+        raise SnapshotError("Values with '\\0' can't be stored in a snapshot")
+    offsets = array("Q", [0])
+    offsets.extend(accumulate(len(value) + 1 for value in encoded))
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    return offsets.tobytes() + text
+
+
+def birthday_key(birth_date):
+    return birth_date.month * 32 + birth_date.day
+
+
+def search_text(name, phones, email):
+    return FIELD_SEPARATOR.join((name.lower(), *phones)) + EMAIL_MARK + (email or "").lower()
+
+
+def encode_numbers(typecode, values):
+    numbers = array(typecode, values)
+    if sys.byteorder != "little":
+        numbers.byteswap()
+    return numbers.tobytes()
+
+
+def encode_indexes(rows):
+    names = [row[0] for row in rows]
+    order = sorted(range(len(rows)), key=names.__getitem__)
+    birthdays = sorted((birthday_key(row[3]), names[number], number)
+                       for number, row in enumerate(rows) if row[3])
+    return [(SORTED, encode_numbers("I", order)),
+            (SEARCH, encode_strings(search_text(name, phones, email) for name, phones, email, _ in rows)),
+            (BIRTHDAY_INDEX, encode_numbers("Q", (key << 32 | number for key, _, number in birthdays)))]
+
+
+def encode_snapshot(rows, indexed=False):
+    # rows - список (ім'я, телефони, email чи None, дата народження чи None) вже перевірених контактів
+    names, phones, emails, ordinals = [], [], [], array("i")
+    for name, record_phones, email, birth_date in rows:
+        names.append(name)
+        phones.append(PHONE_SEPARATOR.join(record_phones))
+        emails.append(email or "")
+        ordinals.append(birth_date.toordinal() if birth_date else 0)
+    if sys.byteorder != "little":
+        ordinals.byteswap()
+    sections = [(NAMES, encode_strings(names)), (PHONES, encode_strings(phones)),
+                (EMAILS, encode_strings(emails)), (BIRTHDAYS, ordinals.tobytes())]
+    if indexed:
+        sections += encode_indexes(rows)
+    position = HEADER.size + SECTION.size * len(sections)
+    directory, payload = [], []
+    for tag, data in sections:
+        padding = -position % ALIGN
+        payload.append(b"\0" * padding + data)
+        position += padding
+        directory.append(SECTION.pack(tag, position, len(data)))
+        position += len(data)
+    body = b"".join(directory + payload)
+    return HEADER.pack(MAGIC, VERSION, 0, len(rows), len(sections), zlib.crc32(body)) + body
+
+
+class Snapshot:
+    # знімок, відкритий через mmap: файл не читається в пам'ять цілком, сторінки підтягує ОС,
+    # і кілька процесів, що відкрили той самий знімок, ділять їх між собою
+    def __init__(self, filename):
+        self.filename = filename
+        self.views = []  # memoryview поверх mmap; їх треба звільнити до закриття mmap
+        with open(filename, "rb") as fh:
+            try:
+                self.map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise SnapshotError(f"{filename} is empty")
+        try:
+            self.read_header()
+        except struct.error:
+            self.map.close()
+            raise SnapshotError(f"{filename} is truncated")
+        except SnapshotError:
+            self.map.close()
+            raise
+
+    def read_header(self):
+        magic, version, _, self.count, sections, self.crc = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise SnapshotError(f"{self.filename} is not an otto snapshot")
+        if version != VERSION:
+            raise SnapshotError(f"{self.filename} has unsupported snapshot version {version}")
+        self.sections = {}
+        for number in range(sections):
+            tag, offset, length = SECTION.unpack_from(self.map, HEADER.size + number * SECTION.size)
+            if offset + length > len(self.map):
+                raise SnapshotError(f"{self.filename} is truncated")
+            self.sections[tag] = (offset, length)
+        missing = {NAMES, PHONES, EMAILS, BIRTHDAYS} - self.sections.keys()
+        if missing:
+            raise SnapshotError(f"{self.filename} has no sections {sorted(missing)}")
+
+    def verify(self):
+        if zlib.crc32(self.map[HEADER.size:]) != self.crc:
+            raise SnapshotError(f"{self.filename} is damaged (checksum mismatch)")
+
+    @property
+    def indexed(self):
+        return all(tag in self.sections for tag in INDEXES)
+
+    def close(self):
+        for view in self.views:
+            view.release()
+        self.views.clear()
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    # ---- всі значення розділу разом ----
+
+    def strings(self, tag):
+        if not self.count:
+            return []
+        offset, _ = self.sections[tag]
+        start = offset + (self.count + 1) * OFFSET.size
+        end = start + OFFSET.unpack_from(self.map, offset + self.count * OFFSET.size)[0]
+        return self.map[start:end - 1].decode("utf-8").split(END)
+
+    def ordinals(self):
+        offset, length = self.sections[BIRTHDAYS]
+        ordinals = array("i")
+        ordinals.frombytes(self.map[offset:offset + length])
+        if sys.byteorder != "little":
+            ordinals.byteswap()
+        return ordinals
+
+    def rows(self):
+        # (ім'я, список телефонів, email чи None, дата народження чи None) для кожного контакту
+        dates = {0: None}
+        for name, phones, email, ordinal in zip(self.strings(NAMES), self.strings(PHONES),
+                                                self.strings(EMAILS), self.ordinals()):
+            birth_date = dates.get(ordinal)
+            if birth_date is None and ordinal:
+                birth_date = dates[ordinal] = date.fromordinal(ordinal)
+            yield name, phones.split(PHONE_SEPARATOR) if phones else [], email or None, birth_date
+
+    # ---- розділ як масив чисел прямо в mmap, без копіювання ----
+
+    def _view(self, offset, length, typecode):
+        if sys.byteorder != "little":
+            numbers = array(typecode)
+            numbers.frombytes(self.map[offset:offset + length])
+            numbers.byteswap()
+            return numbers
+        view = memoryview(self.map)[offset:offset + length].cast(typecode)
+        self.views.append(view)
+        return view
+
+    def numbers(self, tag, typecode):
+        offset, length = self.sections[tag]
+        return self._view(offset, length, typecode)
+
+    def string_index(self, tag):
+        # (зсув першого рядка розділу у файлі, зсуви рядків відносно нього) - для пошуку прямо в mmap
+        offset, _ = self.sections[tag]
+        size = (self.count + 1) * OFFSET.size
+        return offset + size, self._view(offset, size, "Q")
+
+    # ---- одне значення за номером контакту, без читання решти ----
+
+    def string(self, tag, number):
+        offset, _ = self.sections[tag]
+        start, end = OFFSETS.unpack_from(self.map, offset + number * OFFSET.size)
+        base = offset + (self.count + 1) * OFFSET.size
+        return self.map[base + start:base + end - 1].decode("utf-8")
+
+    def row(self, number):
+        phones = self.string(PHONES, number)
+        ordinal = ORDINAL.unpack_from(self.map, self.sections[BIRTHDAYS][0] + number * ORDINAL.size)[0]
+        return (self.string(NAMES, number), phones.split(PHONE_SEPARATOR) if phones else [],
+                self.string(EMAILS, number) or None, date.fromordinal(ordinal) if ordinal else None)
+
+
+def item_row(item, record_class):
+    # рядок знімка з запису json; поля перевіряються так само, як при завантаженні книги
+    try:
+        record = record_class.from_dict(item)
+    except (KeyError, AttributeError, ValueError):
+        raise SnapshotError(f"Invalid contact {item.get('name')!r} in json")
+    return record.name.value, record.phones, record.email.value, record.birthday.date
+
+
+def row_item(row):
+    # запис у форматі save_to_json: порожні поля - рядок "None"
+    name, phones, email, birth_date = row
+    return {"name": name, "phones": phones, "email": str(email),
+            "birthday": birth_date.isoformat() if birth_date else "None"}
+
+
+def json_to_snapshot(json_file, snapshot_file=None, indexed=False):
+    from bot_assistant.contacts import Record
+    from bot_assistant.json_stream import iter_json_file
+    from bot_assistant.storage import write_atomic
+    rows = [item_row(item, Record) for item in iter_json_file(json_file)]
+    write_atomic(snapshot_file or snapshot_name(json_file), encode_snapshot(rows, indexed))
+    return len(rows)
+
+
+def snapshot_to_json(snapshot_file, json_file):
+    import json
+    from bot_assistant.storage import write_atomic
+    with Snapshot(snapshot_file) as snapshot:
+        snapshot.verify()
+        items = [row_item(row) for row in snapshot.rows()]
+    write_atomic(json_file, json.dumps(items, indent=4))
+    return len(items)
+
+
+# python -m bot_assistant.snapshot address_book.json [address_book.snap] - json у знімок,
+# python -m bot_assistant.snapshot address_book.snap address_book.json - знімок назад у json
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) not in (1, 2):
+        print("Usage: python -m bot_assistant.snapshot <address_book.json> [<file.snap>]\n"
+              "       python -m bot_assistant.snapshot <file.snap> <address_book.json>", file=sys.stderr)
+        return 2
+    source = argv[0]
+    try:
+        if source.endswith(".snap"):
+            if len(argv) != 2:
+                print("Please provide the json file to write.", file=sys.stderr)
+                return 2
+            count = snapshot_to_json(source, argv[1])
+            target = argv[1]
+        else:
+            target = argv[1] if len(argv) == 2 else snapshot_name(source)
+            count = json_to_snapshot(source, target)
+    except (OSError, ValueError) as error:
+        print(f"Conversion failed: {error}", file=sys.stderr)
+        return 1
+    print(f"Converted {count} contacts to {target}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import json
+import os
+from pathlib import Path
+from bot_assistant.manifest import SERVICE_FOLDER
+from bot_assistant.storage import write_atomic
+
+PLAN_NAME = 'plan.json'
+PROGRESS_NAME = 'plan.progress'
+PLAN_VERSION = 1
+PREVIEW_LIMIT = 50
+ACTION_ORDER = {"link": 1, "unpack": 2}
+
+
+def numbered_name(name, number):
+    base_name, dot, extension = name.rpartition(".")
+    if not dot:
+        return f"{name}_{number}"
+    return f"{base_name}_{number}.{extension}"
+
+
+class MovePlan:
+    # список кроків (дія, звідки, куди, оригінал) і скільки з них уже виконано.
+    # Дії: "move" - перемістити файл, "extract" - розпакувати архів у папку,
+    # "unpack" - розсортувати вміст архіву по категоріях,
+    # "link" - замінити дублікат жорстким посиланням на оригінал.
+    # План і прогрес зберігаються окремо: план пишеться один раз,
+    # а після кожної порції оновлюється лише маленький файл з прогресом
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        self.steps = []
+        self.done = 0
+        self.targets = set()
+
+    @property
+    def plan_file(self):
+        return self.folder / SERVICE_FOLDER / PLAN_NAME
+
+    @property
+    def progress_file(self):
+        return self.folder / SERVICE_FOLDER / PROGRESS_NAME
+
+    def unique_target(self, target: Path) -> Path:
+        # кілька файлів після normalize можуть отримати одне ім'я - додаємо номер
+        candidate = target
+        number = 1
+        while candidate in self.targets or candidate.exists():
+            candidate = target.with_name(numbered_name(target.name, number))
+            number += 1
+        self.targets.add(candidate)
+        return candidate
+
+    def add(self, action, source: Path, target: Path, original: Path = None):
+        self.steps.append((action, source, target, original))
+
+    def order(self):
+        # кроки з однією папкою призначення йдуть поспіль; посилання - після всіх
+        # переміщень, бо оригінали мають бути вже на місці, а вміст архівів - в останню
+        # чергу, щоб не зайняти імена, заплановані для переміщень
+        self.steps.sort(key=lambda step: (ACTION_ORDER.get(step[0], 0), str(step[2].parent)))
+
+    def batches(self, size):
+        # порції з кроків, що ведуть в одну папку, починаючи з першого невиконаного
+        start = self.done
+        while start < len(self.steps):
+            parent = self.steps[start][2].parent
+            stop = start + 1
+            while stop < len(self.steps) and stop - start < size and self.steps[stop][2].parent == parent:
+                stop += 1
+            yield start, self.steps[start:stop]
+            start = stop
+
+    def save(self):
+        self.plan_file.parent.mkdir(exist_ok=True)
+        steps = [[action, str(source), str(target), str(original) if original else None]
+                 for action, source, target, original in self.steps]
+        write_atomic(self.plan_file, json.dumps({"version": PLAN_VERSION, "folder": str(self.folder), "steps": steps}))
+        self.save_progress()
+
+    def save_progress(self):
+        write_atomic(self.progress_file, str(self.done))
+
+    def remove(self):
+        for name in (self.plan_file, self.progress_file):
+            if name.exists():
+                os.remove(name)
+
+    @classmethod
+    def load(cls, folder):
+        plan = cls(folder)
+        try:
+            with open(plan.plan_file, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except FileNotFoundError:
+            return None
+        if data.get("version") != PLAN_VERSION:
+            return None
+        for action, source, target, original in data["steps"]:
+            plan.add(action, Path(source), Path(target), Path(original) if original else None)
+        try:
+            plan.done = int(plan.progress_file.read_text())
+        except (FileNotFoundError, ValueError):
+            plan.done = 0
+        return plan
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __str__(self):
+        lines = [f"Plan for {self.folder}: {len(self.steps)} steps, {self.done} done"]
+        for action, source, target, _ in self.steps[self.done:self.done + PREVIEW_LIMIT]:
+            lines.append(f"  {action:<7} {os.path.relpath(source, self.folder)} -> {os.path.relpath(target, self.folder)}")
+        hidden = len(self.steps) - self.done - PREVIEW_LIMIT
+        if hidden > 0:
+            lines.append(f"  ... and {hidden} more")
+        return "\n".join(lines)
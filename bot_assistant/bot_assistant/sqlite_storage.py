@@ -0,0 +1,365 @@
+import json
+import os
+import sqlite3
+from collections.abc import MutableMapping, MutableSequence
+from weakref import WeakValueDictionary
+
+
+def database_name(filename):
+    return os.path.splitext(filename)[0] + ".db"
+
+
+class SQLiteStorage:
+    # дані лежать у базі і читаються по одному запису, коли до них звертаються.
+    # Сховище одночасно є індексом книги: пошук виконується запитами до бази.
+    lazy = True
+    prevalidated = False
+    SCHEMA = ""
+
+    def __init__(self, filename):
+        self.filename = filename  # json-файл, з якого дані імпортуються при створенні бази
+        self.db_name = database_name(filename)
+        self.conn = None
+
+    def connect(self):
+        created = not os.path.exists(self.db_name)
+        self.conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+        return created
+
+    def read_json(self):
+        try:
+            with open(self.filename, "r", encoding="utf-8") as fh:
+                return json.load(fh) or []
+        except FileNotFoundError:
+            return []
+
+    def save(self, book):
+        self.conn.commit()
+
+    def flush(self, book):
+        self.conn.commit()
+
+    def checkpoint(self, book):
+        self.conn.commit()
+        return None
+
+    def files(self):
+        return [self.db_name]
+
+    def log(self, book, op, name, item=None):
+        pass
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    # записи змінюються одразу в базі, тому окремо оновлювати індекс не треба
+    def clear(self):
+        pass
+
+    def add(self, item):
+        pass
+
+    def remove(self, item):
+        pass
+
+
+class SQLiteContactStorage(SQLiteStorage):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS contacts (
+            name TEXT PRIMARY KEY,
+            search_name TEXT NOT NULL,
+            email TEXT,
+            birthday TEXT,
+            bd_month INTEGER,
+            bd_day INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS phones (
+            name TEXT NOT NULL,
+            phone TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS phones_phone ON phones(phone);
+        CREATE INDEX IF NOT EXISTS phones_name ON phones(name);
+        CREATE INDEX IF NOT EXISTS contacts_email ON contacts(email COLLATE NOCASE);
+        CREATE INDEX IF NOT EXISTS contacts_birthday ON contacts(bd_month, bd_day);
+    """
+
+    def open(self, book):
+        if self.connect():
+            with self.conn:
+                for item in self.read_json():
+                    self.put(book.record_class.from_dict(item))
+        return SQLiteRecords(self, book), self
+
+    def put(self, record):
+        name = record.name.value
+        birth_date = record.birthday.date
+        self.conn.execute(
+            "INSERT INTO contacts (name, search_name, email, birthday, bd_month, bd_day) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET search_name = excluded.search_name, email = excluded.email, "
+            "birthday = excluded.birthday, bd_month = excluded.bd_month, bd_day = excluded.bd_day",
+            (name, name.lower(), record.email.value, str(record.birthday) if birth_date else None,
+             birth_date.month if birth_date else None, birth_date.day if birth_date else None))
+        self.conn.execute("DELETE FROM phones WHERE name = ?", (name,))
+        self.conn.executemany("INSERT INTO phones (name, phone) VALUES (?, ?)",
+                              [(name, phone) for phone in record.phones])
+
+    def delete(self, name):
+        self.conn.execute("DELETE FROM phones WHERE name = ?", (name,))
+        return self.conn.execute("DELETE FROM contacts WHERE name = ?", (name,)).rowcount
+
+    @staticmethod
+    def row_to_item(row, phones):
+        name, email, birthday = row
+        return {"name": name, "phones": phones, "email": str(email), "birthday": str(birthday)}
+
+    def load_item(self, name):
+        row = self.conn.execute("SELECT name, email, birthday FROM contacts WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        phones = [phone for phone, in self.conn.execute(
+            "SELECT phone FROM phones WHERE name = ? ORDER BY rowid", (name,))]
+        return self.row_to_item(row, phones)
+
+    def iter_items(self):
+        # один запит на всі контакти: рядки одного контакту йдуть поспіль
+        rows = self.conn.execute(
+            "SELECT c.name, c.email, c.birthday, p.phone FROM contacts c "
+            "LEFT JOIN phones p ON p.name = c.name ORDER BY c.rowid, p.rowid")
+        current, phones = None, []
+        for name, email, birthday, phone in rows:
+            if current is not None and current[0] != name:
+                yield self.row_to_item(current, phones)
+                phones = []
+            current = (name, email, birthday)
+            if phone is not None:
+                phones.append(phone)
+        if current is not None:
+            yield self.row_to_item(current, phones)
+
+    def names(self):
+        return [name for name, in self.conn.execute("SELECT name FROM contacts ORDER BY rowid")]
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+
+    def contains(self, name):
+        return self.conn.execute("SELECT 1 FROM contacts WHERE name = ?", (name,)).fetchone() is not None
+
+    # пакет записів однією транзакцією
+    def put_many(self, records):
+        with self.conn:
+            for record in records:
+                self.put(record)
+
+    def log(self, book, op, name, item=None):
+        if op in ("phone", "email", "birthday"):
+            with self.conn:
+                self.put(book.data[name])
+
+    # інтерфейс ContactIndex
+    def update(self, record):
+        pass
+
+    def find_phone(self, phone):
+        row = self.conn.execute("SELECT name FROM phones WHERE phone = ? LIMIT 1", (phone,)).fetchone()
+        return row[0] if row else None
+
+    def find_email(self, email):
+        return {name for name, in self.conn.execute(
+            "SELECT name FROM contacts WHERE email = ? COLLATE NOCASE", (email,))}
+
+    def search(self, query):
+        query = query.lower()
+        if not query:
+            return set(self.names())
+        return {name for name, in self.conn.execute(
+            "SELECT name FROM contacts WHERE instr(search_name, ?) > 0 "
+            "UNION SELECT name FROM phones WHERE instr(phone, ?) > 0", (query, query))}
+
+    def birthdays_between(self, first, last):
+        return [name for name, in self.conn.execute(
+            "SELECT name FROM contacts WHERE (bd_month, bd_day) BETWEEN (?, ?) AND (?, ?) "
+            "ORDER BY bd_month, bd_day, name", (*first, *last))]
+
+
+class SQLiteRecords(MutableMapping):
+    # словник контактів поверх бази; вже завантажені записи кешуються,
+    # доки на них є посилання, щоб зміни йшли в той самий об'єкт
+    def __init__(self, storage, book):
+        self.storage = storage
+        self.book = book
+        self.cache = WeakValueDictionary()
+
+    def _record(self, item):
+        record = self.cache.get(item["name"])
+        if record is None:
+            record = self.book.record_class.from_dict(item)
+            record.book = self.book
+            self.cache[item["name"]] = record
+        return record
+
+    def __getitem__(self, name):
+        record = self.cache.get(name)
+        if record is not None:
+            return record
+        item = self.storage.load_item(name)
+        if item is None:
+            raise KeyError(name)
+        return self._record(item)
+
+    def __setitem__(self, name, record):
+        with self.storage.conn:
+            self.storage.put(record)
+        self.cache[name] = record
+
+    def __delitem__(self, name):
+        with self.storage.conn:
+            deleted = self.storage.delete(name)
+        self.cache.pop(name, None)
+        if not deleted:
+            raise KeyError(name)
+
+    def __iter__(self):
+        return iter(self.storage.names())
+
+    def __len__(self):
+        return self.storage.count()
+
+    def __contains__(self, name):
+        return self.storage.contains(name)
+
+    def values(self):
+        for item in self.storage.iter_items():
+            yield self._record(item)
+
+
+class SQLiteNoteStorage(SQLiteStorage):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS notes (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            text TEXT NOT NULL,
+            tags TEXT NOT NULL,
+            creation_date TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS notes_title ON notes(title);
+        -- теги шукаються через notes_fts; окрема таблиця тегів зі старих баз нікому не потрібна
+        DROP TABLE IF EXISTS note_tags;
+        CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(title, text, tags);
+    """
+    COLUMNS = "id, title, text, tags, creation_date"
+
+    def open(self, book):
+        self.book = book
+        if self.connect():
+            with self.conn:
+                for item in self.read_json():
+                    self.insert(book.note_class.from_dict(item))
+        return SQLiteNotes(self), self
+
+    def insert(self, note):
+        note.id = self.conn.execute(
+            "INSERT INTO notes (title, text, tags, creation_date) VALUES (?, ?, ?, ?)",
+            (note.title, note.text, json.dumps(note.tags), str(note.creation_date))).lastrowid
+        self._index_note(note)
+
+    def _index_note(self, note):
+        self.conn.execute("INSERT INTO notes_fts (rowid, title, text, tags) VALUES (?, ?, ?, ?)",
+                          (note.id, note.title, note.text, " ".join(note.tags)))
+
+    def _unindex_note(self, note_id):
+        self.conn.execute("DELETE FROM notes_fts WHERE rowid = ?", (note_id,))
+
+    def delete(self, note_id):
+        self._unindex_note(note_id)
+        self.conn.execute("DELETE FROM notes WHERE id = ?", (note_id,))
+
+    def to_note(self, row):
+        note_id, title, text, tags, creation_date = row
+        note = self.book.note_class.from_dict(
+            {"title": title, "text": text, "tags": json.loads(tags), "creation_date": creation_date})
+        note.id = note_id
+        return note
+
+    def id_at(self, position):
+        row = self.conn.execute("SELECT id FROM notes ORDER BY id LIMIT 1 OFFSET ?", (position,)).fetchone()
+        if row is None:
+            raise IndexError("note index out of range")
+        return row[0]
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def iter_items(self):
+        for _, title, text, tags, creation_date in self.conn.execute(f"SELECT {self.COLUMNS} FROM notes ORDER BY id"):
+            yield {"title": title, "text": text, "tags": json.loads(tags), "creation_date": creation_date}
+
+    def iter_notes(self):
+        for row in self.conn.execute(f"SELECT {self.COLUMNS} FROM notes ORDER BY id"):
+            yield self.to_note(row)
+
+    # інтерфейс NoteIndex
+    def update(self, note):
+        with self.conn:
+            self.conn.execute("UPDATE notes SET title = ?, text = ?, tags = ? WHERE id = ?",
+                              (note.title, note.text, json.dumps(note.tags), note.id))
+            self._unindex_note(note.id)
+            self._index_note(note)
+
+    def search(self, terms, mode="or"):
+        if not terms:
+            return []
+        # пошук за префіксом кожного слова; ваги колонок як у NoteIndex: назва 3, текст 1, теги 2
+        operator = " AND " if mode == "and" else " OR "
+        query = operator.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+        rows = self.conn.execute(
+            f"SELECT {', '.join('n.' + column for column in self.COLUMNS.split(', '))} "
+            "FROM notes_fts JOIN notes n ON n.id = notes_fts.rowid WHERE notes_fts MATCH ? "
+            "ORDER BY bm25(notes_fts, 3.0, 1.0, 2.0), n.creation_date DESC", (query,))
+        return [self.to_note(row) for row in rows]
+
+
+class SQLiteNotes(MutableSequence):
+    # список нотаток поверх бази в порядку додавання
+    def __init__(self, storage):
+        self.storage = storage
+
+    def __len__(self):
+        return self.storage.count()
+
+    def __iter__(self):
+        return self.storage.iter_notes()
+
+    def _position(self, index):
+        if index < 0:
+            index += len(self)
+        if index < 0:
+            raise IndexError("note index out of range")
+        return index
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        note_id = self.storage.id_at(self._position(index))
+        row = self.storage.conn.execute(
+            f"SELECT {self.storage.COLUMNS} FROM notes WHERE id = ?", (note_id,)).fetchone()
+        return self.storage.to_note(row)
+
+    def __setitem__(self, index, note):
+        note.id = self.storage.id_at(self._position(index))
+        self.storage.update(note)
+
+    def __delitem__(self, index):
+        note_id = self.storage.id_at(self._position(index))
+        with self.storage.conn:
+            self.storage.delete(note_id)
+
+    def insert(self, index, note):
+        # нотатки зберігаються в порядку додавання, тому вставити можна лише в кінець
+        if index < len(self):
+            raise ValueError("Notes can only be appended")
+        with self.storage.conn:
+            self.storage.insert(note)
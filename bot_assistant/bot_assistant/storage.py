@@ -0,0 +1,313 @@
+import json
+import os
+import shutil
+import threading
+from functools import partial
+from bot_assistant.json_stream import iter_json_file
+from bot_assistant.mapped_storage import MappedContactStorage
+from bot_assistant.snapshot import Snapshot, encode_snapshot, row_item, snapshot_name
+from bot_assistant.sqlite_storage import SQLiteContactStorage, SQLiteNoteStorage
+
+
+def write_atomic(filename, content):
+    # пишемо в тимчасовий файл і підміняємо ним старий, щоб при збої не лишити напівзаписаний файл
+    temp_name = f"{filename}.tmp"
+    with open(temp_name, "wb") if isinstance(content, bytes) else open(temp_name, "w", encoding="utf-8") as fh:
+        fh.write(content)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(temp_name, filename)
+    fsync_folder(filename)
+
+
+def fsync_folder(filename):
+    # сама заміна файлу теж має дійти до диска; на Windows папку так відкрити не можна
+    if os.name != "posix":
+        return
+    folder = os.open(os.path.dirname(os.path.abspath(filename)), os.O_RDONLY)
+    try:
+        os.fsync(folder)
+    finally:
+        os.close(folder)
+
+
+class JsonStorage:
+    # весь файл читається при запуску і перезаписується при збереженні
+    lazy = False
+    prevalidated = False  # load_records повертає готові записи без повторної перевірки полів
+
+    def __init__(self, filename):
+        self.filename = filename
+        # знімки нумеруються, щоб старіший знімок не перезаписав новіший,
+        # якщо автозбереження і вихід записують файл одночасно
+        self.write_lock = threading.Lock()
+        self.snapshots = 0
+        self.written = 0
+
+    def load(self):
+        # записи читаються з файлу по одному, без розбору всього файлу наперед
+        return iter_json_file(self.filename)
+
+    def iter_items(self):
+        return self.load()
+
+    def write_snapshot(self, items):
+        write_atomic(self.filename, json.dumps(items, indent=4))
+
+    def save(self, book):
+        self.checkpoint(book)()
+
+    # дані для write_snapshot; беруться під замком бота
+    def snapshot(self, book):
+        return book.dump()
+
+    def flush(self, book):
+        self.save(book)
+
+    # знімок робиться одразу (під замком бота), а повернута функція записує його пізніше
+    def checkpoint(self, book):
+        items = self.snapshot(book)
+        with self.write_lock:
+            self.snapshots += 1
+            number = self.snapshots
+        return partial(self.write_checkpoint, items, number)
+
+    def write_checkpoint(self, items, number):
+        with self.write_lock:
+            if number < self.written:
+                return  # уже записано новіший знімок
+            self.write_snapshot(items)
+            self.written = number
+
+    # файли, які займає книга на диску
+    def files(self):
+        return [self.filename]
+
+    def log(self, book, op, name, item=None):
+        pass
+
+    def log_many(self, book, op, records):
+        pass
+
+    def close(self):
+        pass
+
+
+class JournalStorage(JsonStorage):
+    # кожна зміна дописується рядком у журнал, а знімок файлу періодично
+    # перебудовується у фоновому потоці.
+    # Записи журналу містять повний стан контакту, тому повторне
+    # застосування журналу до новішого знімка нічого не ламає.
+    def __init__(self, filename, compact_every=1000):
+        super().__init__(filename)
+        self.journal_name = f"{filename}.journal"
+        self.compacting_name = f"{filename}.compacting"
+        self.compact_every = compact_every
+        self.entries = 0
+        self.journal = None
+        self.worker = None
+        self.lock = threading.Lock()
+
+    def files(self):
+        return [self.filename, self.journal_name]
+
+    def read_items(self):
+        items = {}
+        found = False
+        try:
+            for item in super().load():
+                items[item["name"]] = item
+            found = True
+        except FileNotFoundError:
+            pass
+        self.entries = 0
+        for name in (self.compacting_name, self.journal_name):
+            if os.path.exists(name):
+                found = True
+                self.entries += self.replay(name, items)
+        if not found:
+            raise FileNotFoundError(self.filename)
+        return items
+
+    def load(self):
+        leftover = os.path.exists(self.compacting_name)
+        items = self.read_items()
+        if leftover:
+            # попереднє ущільнення не завершилось - доводимо його до кінця зараз
+            self.write_snapshot(list(items.values()))
+            os.remove(self.compacting_name)
+            if os.path.exists(self.journal_name):
+                os.remove(self.journal_name)
+            self.entries = 0
+        return list(items.values())
+
+    def iter_items(self):
+        return iter(self.read_items().values())
+
+    @staticmethod
+    def replay(journal_name, items):
+        with open(journal_name, "rb") as fh:
+            content = fh.read()
+        if content and not content.endswith(b"\n"):
+            # останній запис обірвався під час збою - відкидаємо його
+            content = content[:content.rfind(b"\n") + 1]
+            with open(journal_name, "r+b") as fh:
+                fh.truncate(len(content))
+        entries = 0
+        for line in content.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            entries += 1
+            if entry["op"] in ("delete", "rename"):
+                items.pop(entry["name"], None)
+            if entry["op"] != "delete":
+                record = entry["record"]
+                items[record["name"]] = record
+        return entries
+
+    def log(self, book, op, name, item=None):
+        entry = {"op": op, "name": name}
+        if item is not None:
+            entry["record"] = item
+        with self.lock:
+            if self.journal is None:
+                self.journal = open(self.journal_name, "a", encoding="utf-8")
+            self.journal.write(json.dumps(entry) + "\n")
+            self.journal.flush()
+            self.entries += 1
+            due = self.entries >= self.compact_every
+        if due:
+            self.compact(book, background=True)
+
+    def log_many(self, book, op, records):
+        # одним записом у журнал для всього пакета. Ущільнення тут не запускається: при імпорті
+        # пакети йдуть один за одним, і кожне ущільнення знову копіювало б усю книгу;
+        # воно відбудеться при наступній зміні чи збереженні
+        lines = "".join(json.dumps({"op": op, "name": record.name.value, "record": record.to_dict()}) + "\n"
+                        for record in records)
+        with self.lock:
+            if self.journal is None:
+                self.journal = open(self.journal_name, "a", encoding="utf-8")
+            self.journal.write(lines)
+            self.journal.flush()
+            self.entries += len(records)
+
+    def flush(self, book):
+        with self.lock:
+            if self.journal is not None:
+                self.journal.flush()
+                os.fsync(self.journal.fileno())
+
+    def save(self, book):
+        self.compact(book)
+
+    # зміни вже в журналі, досить дописати їх на диск
+    def checkpoint(self, book):
+        self.flush(book)
+        return None
+
+    def compact(self, book, background=False):
+        if self.worker is not None:
+            if background and self.worker.is_alive():
+                return
+            self.worker.join()
+            self.worker = None
+        with self.lock:
+            items = book.dump()
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
+            if os.path.exists(self.journal_name):
+                if os.path.exists(self.compacting_name):
+                    # попереднє ущільнення не записало знімок, і його записи ще потрібні -
+                    # журнал дописується після них, а не замінює їх
+                    self._append_journal()
+                else:
+                    os.replace(self.journal_name, self.compacting_name)
+            self.entries = 0
+        if background:
+            self.worker = threading.Thread(target=self._write_compacted, args=(items,), daemon=True)
+            self.worker.start()
+        else:
+            self._write_compacted(items)
+
+    def _append_journal(self):
+        with open(self.journal_name, "rb") as source, open(self.compacting_name, "ab") as target:
+            shutil.copyfileobj(source, target)
+            target.flush()
+            os.fsync(target.fileno())
+        os.remove(self.journal_name)
+
+    def _write_compacted(self, items):
+        self.write_snapshot(items)
+        if os.path.exists(self.compacting_name):
+            os.remove(self.compacting_name)
+
+    def close(self):
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
+        with self.lock:
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
+
+
+class BinaryStorage(JsonStorage):
+    # контакти зберігаються в бінарному знімку поруч з json-файлом (див. snapshot.py):
+    # дати вже розібрані, а поля перевірені при записі, тож при завантаженні не перевіряються.
+    # Json лишається форматом обміну: поки знімка нема, контакти читаються з json-файлу
+    prevalidated = True
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        self.snapshot_name = snapshot_name(filename)
+
+    def files(self):
+        return [self.snapshot_name]
+
+    def load_records(self, record_class):
+        # None - знімка ще нема, книга читається з json
+        if not os.path.exists(self.snapshot_name):
+            return None
+        with Snapshot(self.snapshot_name) as snapshot:
+            snapshot.verify()
+            return [record_class.from_trusted(*row) for row in snapshot.rows()]
+
+    def load(self):
+        if not os.path.exists(self.snapshot_name):
+            return super().load()
+        with Snapshot(self.snapshot_name) as snapshot:
+            snapshot.verify()
+            return [row_item(row) for row in snapshot.rows()]
+
+    def snapshot(self, book):
+        return [(record.name.value, list(record.phones), record.email.value, record.birthday.date)
+                for record in book.data.values()]
+
+    def write_snapshot(self, rows):
+        write_atomic(self.snapshot_name, encode_snapshot(rows))
+
+
+STORAGES = {
+    "json": JsonStorage,
+    "journal": JournalStorage,
+    "sqlite": SQLiteContactStorage,
+    "binary": BinaryStorage,
+    "mapped": MappedContactStorage,
+}
+
+NOTE_STORAGES = {
+    "json": JsonStorage,
+    "sqlite": SQLiteNoteStorage,
+}
+
+
+def make_storage(storage, filename, storages=STORAGES):
+    if isinstance(storage, str):
+        try:
+            return storages[storage](filename)
+        except KeyError:
+            raise ValueError(f"Unknown storage '{storage}'")
+    return storage